@@ -1,45 +1,58 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+import operator
 import os
-import sys
+import threading
 import uuid
 import warnings
-from collections import namedtuple, OrderedDict
-from itertools import groupby, repeat
+from collections import namedtuple, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 from math import ceil
 
+import cachetools
 import numpy
 import pandas
 import xarray
-
-try:
-    import SharedArray as sa
-except ImportError:
-    pass
 from affine import Affine
 from dask import array as da
-
-try:
-    from pathos.threading import ThreadPool
-except ImportError:
-    pass
 from six.moves import zip
 
 from datacube.config import LocalConfig
 from datacube.compat import string_types
-from datacube.storage.storage import reproject_and_fuse
+from datacube.storage.result_cache import get_result_cache
+from datacube.storage.storage import reproject_and_fuse_bands, measurement_paths, scratch_buffers, \
+    bind_scratch_buffers
 from datacube.utils import geometry, intersects, data_resolution_and_offset
+from datacube.utils.stats import bind_stats, timed
 from .query import Query, query_group_by, query_geopolygon
 from ..index import index_connect
 from ..drivers import new_datasource
 
 _LOG = logging.getLogger(__name__)
-THREADING_REQS_AVAILABLE = ('SharedArray' in sys.modules and 'pathos.threading' in sys.modules)
 
 Group = namedtuple('Group', ['key', 'datasets'])
 
 
+class LoadPlan(namedtuple('LoadPlan', ['shape', 'output_bytes', 'datasets', 'files', 'bytes_read', 'warps',
+                                       'fuses', 'dask_tasks'])):
+    """
+    Estimated cost of a load, as computed by :meth:`Datacube.plan_load` without reading any data.
+
+    :param tuple shape: shape of every output array
+    :param int output_bytes: total size of the output arrays
+    :param int datasets: number of dataset reads, datasets which don't overlap the output aren't read
+    :param int files: number of files to open
+    :param OrderedDict bytes_read: estimated (uncompressed) bytes read per measurement. Reading may stop early
+        with the default fuser, and coarse loads may read from overviews, so this is an upper bound
+    :param int warps: number of band reads requiring a reprojection or resampling
+    :param int fuses: number of fuse operations combining overlapping datasets
+    :param int dask_tasks: number of tasks in the dask graph, or 0 when not loading lazily
+    """
+    __slots__ = ()
+
+
 class Datacube(object):
     """
     Interface to search, read and write a datacube.
@@ -145,7 +158,8 @@ class Datacube(object):
 
     #: pylint: disable=too-many-arguments, too-many-locals
     def load(self, product=None, measurements=None, output_crs=None, resolution=None, resampling=None, stack=False,
-             dask_chunks=None, like=None, fuse_func=None, align=None, datasets=None, use_threads=False, **query):
+             dask_chunks=None, like=None, fuse_func=None, align=None, datasets=None, use_threads=False,
+             order_by_overlap=False, memmap_dir=None, **query):
         """
         Load data as an ``xarray`` object.  Each measurement will be a data variable in the :class:`xarray.Dataset`.
 
@@ -242,10 +256,15 @@ class Datacube(object):
         :param str resampling:
             The resampling method to use if re-projection is required.
 
-            Valid values are: ``'nearest', 'cubic', 'bilinear', 'cubic_spline', 'lanczos', 'average'``
+            Valid values are: ``'nearest', 'cubic', 'bilinear', 'cubic_spline', 'lanczos', 'average'``,
+            and with rasterio 1.0 or later ``'mode', 'min', 'max'``
 
             Defaults to ``'nearest'``.
 
+            Data in the output CRS at an integer ratio of the output resolution (eg. 20m data on a 10m grid)
+            is resampled with numpy when using ``'nearest', 'average', 'mode', 'min'`` or ``'max'``, which is
+            much faster than a GDAL warp.
+
         :param (float,float) align:
             Load data such that point 'align' lies on the pixel boundary.
             Units are in the co-ordinate space of the output CRS.
@@ -280,12 +299,30 @@ class Datacube(object):
             data is simply copied over the top of each other, in a relatively undefined manner. This function can
             perform a specific combining step, eg. for combining GA PQ data.
 
+            Can also be the name of one of the fusers in :data:`datacube.storage.fusers.FUSERS`,
+            eg. ``'max'``, ``'median'`` or ``'ga_pq'``.
+
+        :param bool order_by_overlap:
+            Optional. If this is set to True, the datasets of every group are fused in order of how much of the
+            output they cover, largest first, rather than in ``group_by`` order. With the default ``fuse_func``
+            this means fewer files need to be read before the output is complete, but it changes which dataset
+            has priority where they overlap.
+
+            Default is False.
+
+        :param str memmap_dir:
+            Optional. Directory in which to store the loaded data, as one ``<measurement name>.npy`` file per
+            measurement, instead of in memory. The returned :class:`xarray.Dataset` wraps read/write
+            :class:`numpy.memmap` arrays of these files, which makes it possible to load more data than fits in
+            memory. Not supported together with `dask_chunks`.
+
         :param datasets:
             Optional. If this is a non-empty list of :class:`datacube.model.Dataset` objects, these will be loaded
             instead of performing a database lookup.
 
-        :param bool use_threads:
-            Optional. If this is set to True, IO will be multi-thread.
+        :param use_threads:
+            Optional. If this is set to True, IO will be multi-threaded, using a thread per CPU.
+            An integer sets the number of threads to use instead.
             May not work for all drivers due to locking/GIL.
 
             Default is False.
@@ -299,9 +336,100 @@ class Datacube(object):
 
         :rtype: :class:`xarray.Dataset` or :class:`xarray.DataArray`
         """
+        prepared = self._prepare_load(product=product, measurements=measurements, output_crs=output_crs,
+                                      resolution=resolution, resampling=resampling, like=like, align=align,
+                                      datasets=datasets, **query)
+        if prepared is None:
+            return None if stack else xarray.Dataset()
+        grouped, geobox, measurements = prepared
+
+        result = self.load_data(grouped, geobox, measurements,
+                                fuse_func=fuse_func,
+                                dask_chunks=dask_chunks,
+                                use_threads=use_threads,
+                                order_by_overlap=order_by_overlap,
+                                memmap_dir=memmap_dir)
+        if not stack:
+            return result
+        else:
+            if not isinstance(stack, string_types):
+                stack = 'measurement'
+            return result.to_array(dim=stack)
+
+    #: pylint: disable=too-many-arguments
+    def load_iter(self, product=None, measurements=None, output_crs=None, resolution=None, resampling=None,
+                  like=None, fuse_func=None, align=None, datasets=None, use_threads=False, order_by_overlap=False,
+                  prefetch=1, **query):
+        """
+        Load data one group (eg. time slice) at a time, yielding an :class:`xarray.Dataset` for each.
+
+        Takes the same arguments as :meth:`load`, except for `stack` and `dask_chunks`. Each yielded
+        :class:`xarray.Dataset` covers the same area, and has a `time` dimension (or the `group_by` dimension)
+        of length one. Only the slices being loaded ahead and the one being processed are held in memory.
+        ::
+
+            for data in dc.load_iter(product='ls5_nbar_albers', x=(148.15, 148.2), y=(-35.15, -35.2)):
+                ...
+
+        :param int prefetch:
+            Optional. Number of slices to load ahead, in background threads, while the current slice is
+            being processed. 0 loads each slice only when it is requested.
+
+            Default is 1.
+
+        .. seealso:: :meth:`load`
+        """
+        prepared = self._prepare_load(product=product, measurements=measurements, output_crs=output_crs,
+                                      resolution=resolution, resampling=resampling, like=like, align=align,
+                                      datasets=datasets, **query)
+        if prepared is None:
+            return
+        grouped, geobox, measurements = prepared
+
+        def load_slice(index):
+            return self.load_data(grouped[index:index + 1], geobox, measurements,
+                                  fuse_func=fuse_func,
+                                  use_threads=use_threads,
+                                  order_by_overlap=order_by_overlap)
+
+        for data in _iter_prefetched(load_slice, range(grouped.size), prefetch):
+            yield data
+
+    def plan_load(self, product=None, measurements=None, output_crs=None, resolution=None, resampling=None,
+                  dask_chunks=None, like=None, align=None, datasets=None, **query):
+        """
+        Estimate the cost of a :meth:`load` with the same arguments, without reading any data.
+
+        Useful to reject overly large queries, or to size the memory of workers, before loading.
+        ::
+
+            plan = dc.plan_load(product='ls5_nbar_albers', x=(148.15, 148.2), y=(-35.15, -35.2))
+            if plan.output_bytes > 10 * 1024 ** 3:
+                raise ValueError('Query too large')
+
+        :return: the load plan, or None if no datasets were found
+        :rtype: LoadPlan
+
+        .. seealso:: :meth:`load` :meth:`plan_load_data`
+        """
+        prepared = self._prepare_load(product=product, measurements=measurements, output_crs=output_crs,
+                                      resolution=resolution, resampling=resampling, like=like, align=align,
+                                      datasets=datasets, **query)
+        if prepared is None:
+            return None
+        grouped, geobox, measurements = prepared
+        return self.plan_load_data(grouped, geobox, measurements, dask_chunks=dask_chunks)
+
+    def _prepare_load(self, product=None, measurements=None, output_crs=None, resolution=None, resampling=None,
+                      like=None, align=None, datasets=None, **query):
+        """
+        Find and group the datasets to load, and work out the output geobox and measurements.
+
+        :return: (grouped datasets, geobox, list of measurements), or None if no datasets were found
+        """
         observations = datasets or self.find_datasets(product=product, like=like, **query)
         if not observations:
-            return None if stack else xarray.Dataset()
+            return None
 
         if like is not None:
             assert output_crs is None, "'like' and 'output_crs' are not supported together"
@@ -332,16 +460,7 @@ class Datacube(object):
         measurements = self.index.products.get_by_name(product).lookup_measurements(measurements)
         measurements = set_resampling_method(measurements, resampling)
 
-        result = self.load_data(grouped, geobox, measurements.values(),
-                                fuse_func=fuse_func,
-                                dask_chunks=dask_chunks,
-                                use_threads=use_threads)
-        if not stack:
-            return result
-        else:
-            if not isinstance(stack, string_types):
-                stack = 'measurement'
-            return result.to_array(dim=stack)
+        return grouped, geobox, list(measurements.values())
 
     def product_observations(self, **kwargs):
         warnings.warn("product_observations() has been renamed to find_datasets() and will eventually be removed",
@@ -358,7 +477,8 @@ class Datacube(object):
 
         .. seealso:: :meth:`group_datasets` :meth:`load_data` :meth:`find_datasets_lazy`
         """
-        return list(self.find_datasets_lazy(**search_terms))
+        with timed('index_search'):
+            return list(self.find_datasets_lazy(**search_terms))
 
     def find_datasets_lazy(self, limit=None, **kwargs):
         """
@@ -379,10 +499,14 @@ class Datacube(object):
                                               **query.search_terms)
 
         polygon = query.geopolygon
+        polygon_in_crs = {}
         for dataset in datasets:
             if polygon:
                 # Check against the bounding box of the original scene, can throw away some portions
-                if intersects(polygon.to_crs(dataset.crs), dataset.extent):
+                crs = dataset.crs
+                if crs not in polygon_in_crs:
+                    polygon_in_crs[crs] = polygon.to_crs(crs).prepare()
+                if intersects(polygon_in_crs[crs], dataset.extent):
                     yield dataset
             else:
                 yield dataset
@@ -442,9 +566,9 @@ class Datacube(object):
             as an argument. It should return an appropriately shaped numpy array. If not provided, an empty
             :class:`xarray.Dataset` is returned.
 
-        :param bool use_threads:
-            Optional. If this is set to True, IO will be multi-thread.
-            May not work for all drivers due to locking/GIL.
+        :param use_threads:
+            Optional. If this is set to True (or to a number of threads), `data_func` is called for all the
+            measurements concurrently.
 
             Default is False.
 
@@ -465,19 +589,13 @@ class Datacube(object):
         for name, coord in geobox.coordinates.items():
             result[name] = (name, coord.values, {'units': coord.units})
 
-        def work_measurements(measurement, data_func):
-            return data_func(measurement)
-
-        use_threads = use_threads and THREADING_REQS_AVAILABLE
-
         if use_threads:
-            pool = ThreadPool(32)
-            results = pool.map(work_measurements, measurements, repeat(data_func))
+            with ThreadPoolExecutor(max_workers=_num_threads(use_threads)) as executor:
+                results = list(executor.map(data_func, measurements))
         else:
             results = [data_func(a) for a in measurements]
 
-        for measurement in measurements:
-            data = results.pop(0)
+        for measurement, data in zip(measurements, results):
 
             attrs = {
                 'nodata': measurement.get('nodata'),
@@ -502,7 +620,7 @@ class Datacube(object):
 
     @staticmethod
     def load_data(sources, geobox, measurements, fuse_func=None, dask_chunks=None, skip_broken_datasets=False,
-                  use_threads=False):
+                  use_threads=False, order_by_overlap=False, memmap_dir=None, out=None):
         """
         Load data from :meth:`group_datasets` into an :class:`xarray.Dataset`.
 
@@ -516,7 +634,7 @@ class Datacube(object):
             list of measurement dicts with keys: {'name', 'dtype', 'nodata', 'units'}
 
         :param fuse_func:
-            function to merge successive arrays as an output
+            function to merge successive arrays as an output, or the name of a fuser, see :meth:`load`
 
         :param dict dask_chunks:
             If provided, the data will be loaded on demand using using :class:`dask.array.Array`.
@@ -525,50 +643,137 @@ class Datacube(object):
             See the documentation on using `xarray with dask <http://xarray.pydata.org/en/stable/dask.html>`_
             for more information.
 
-        :param bool use_threads:
-            Optional. If this is set to True, IO will be multi-thread.
+        :param use_threads:
+            Optional. If this is set to True, IO will be multi-threaded, using a thread per CPU.
+            An integer sets the number of threads to use instead.
+            The work is split by time slice, and into blocks of rows when there are fewer time slices than
+            threads. Ignored when `dask_chunks` is provided.
             May not work for all drivers due to locking/GIL.
 
             Default is False.
 
+        :param bool order_by_overlap:
+            Optional. Fuse the datasets of every group in order of how much of `geobox` they cover, largest first.
+            See :meth:`load`.
+
+        :param str memmap_dir:
+            Optional. Directory in which to create a ``<measurement name>.npy`` file for every measurement, to
+            load the data into instead of memory. See :meth:`load`.
+
+        :param dict out:
+            Optional. Arrays to load the data into, by measurement name, eg. preallocated or in shared memory.
+            Their shape must be ``sources.shape + geobox.shape``, and every pixel gets overwritten.
+            Measurements without an array in `out` are allocated as usual.
+
         :rtype: xarray.Dataset
 
         .. seealso:: :meth:`find_datasets` :meth:`group_datasets`
         """
-        if use_threads and ('SharedArray' not in sys.modules or 'pathos.threading' not in sys.modules):
-            use_threads = False
+        measurements = list(measurements)
+        out = out or {}
+
+        if memmap_dir is not None and dask_chunks is not None:
+            raise ValueError("'memmap_dir' and 'dask_chunks' are not supported together")
+        if out and dask_chunks is not None:
+            raise ValueError("'out' and 'dask_chunks' are not supported together")
+
+        shape = sources.shape + geobox.shape
+        for name, data in out.items():
+            if data.shape != shape:
+                raise ValueError('Output array for {} has shape {}, expected {}'.format(name, data.shape, shape))
 
         if dask_chunks is None:
-            def data_func(measurement):
-                if not use_threads:
-                    data = numpy.full(sources.shape + geobox.shape, measurement['nodata'], dtype=measurement['dtype'])
-                    for index, datasets in numpy.ndenumerate(sources.values):
-                        _fuse_measurement(data[index], datasets, geobox, measurement, fuse_func=fuse_func,
-                                          skip_broken_datasets=skip_broken_datasets)
+            arrays = OrderedDict((measurement['name'],
+                                  out[measurement['name']] if measurement['name'] in out else
+                                  _allocate(shape, measurement, memmap_dir))
+                                 for measurement in measurements)
+
+            def work_load_data(index, rows, datasets):
+                _fuse_measurements([data[index + (rows,)] for data in arrays.values()],
+                                   datasets, geobox[rows, :], measurements,
+                                   fuse_func=fuse_func,
+                                   skip_broken_datasets=skip_broken_datasets,
+                                   order_by_overlap=order_by_overlap)
+
+            with scratch_buffers():
+                if use_threads:
+                    num_threads = _num_threads(use_threads)
+                    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                        work = bind_stats(bind_scratch_buffers(work_load_data))
+                        futures = [executor.submit(work, index, rows, datasets)
+                                   for rows in _row_blocks(geobox.height, ceil(num_threads / max(sources.size, 1)))
+                                   for index, datasets in numpy.ndenumerate(sources.values)]
+                        for future in futures:
+                            future.result()
                 else:
-                    def work_load_data(array_name, index, datasets):
-                        data = sa.attach(array_name)
-                        _fuse_measurement(data[index], datasets, geobox, measurement, fuse_func=fuse_func,
-                                          skip_broken_datasets=skip_broken_datasets)
-
-                    array_name = '_'.join(['DCCORE', str(uuid.uuid4()), str(os.getpid())])
-                    sa.create(array_name, shape=sources.shape + geobox.shape, dtype=measurement['dtype'])
-                    data = sa.attach(array_name)
-                    data[:] = measurement['nodata']
-
-                    pool = ThreadPool(32)
-                    pool.map(work_load_data, repeat(array_name), *zip(*numpy.ndenumerate(sources.values)))
-                    sa.delete(array_name)
-                return data
+                    for index, datasets in numpy.ndenumerate(sources.values):
+                        work_load_data(index, slice(None), datasets)
+
+            def data_func(measurement):
+                return arrays[measurement['name']]
         else:
+            arrays = _make_dask_arrays(sources, geobox, measurements,
+                                       skip_broken_datasets=skip_broken_datasets,
+                                       fuse_func=fuse_func,
+                                       dask_chunks=dask_chunks,
+                                       order_by_overlap=order_by_overlap)
+
             def data_func(measurement):
-                return _make_dask_array(sources, geobox, measurement,
-                                        skip_broken_datasets=skip_broken_datasets,
-                                        fuse_func=fuse_func,
-                                        dask_chunks=dask_chunks)
+                return arrays[measurement['name']]
 
         return Datacube.create_storage(OrderedDict((dim, sources.coords[dim]) for dim in sources.dims),
-                                       geobox, measurements, data_func, use_threads)
+                                       geobox, measurements, data_func)
+
+    @staticmethod
+    def plan_load_data(sources, geobox, measurements, dask_chunks=None):
+        """
+        Estimate the cost of :meth:`load_data` with the same arguments, without reading any data.
+
+        :param xarray.DataArray sources:
+            DataArray holding a list of :class:`datacube.model.Dataset`, grouped along the time dimension
+        :param GeoBox geobox: A GeoBox defining the output spatial projection and resolution
+        :param measurements: list of measurement dicts with keys: {'name', 'dtype', 'nodata', 'units'}
+        :param dict dask_chunks: If provided, estimate the cost of a lazy load with these chunks
+        :rtype: LoadPlan
+        """
+        measurements = list(measurements)
+        shape = sources.shape + geobox.shape
+
+        if dask_chunks is None:
+            chunks = [geobox]
+        else:
+            _, grid_chunks = _calculate_chunk_sizes(sources, geobox, dask_chunks)
+            chunks = list(_chunk_geobox(geobox, grid_chunks).values())
+
+        itemsizes = [numpy.dtype(measurement['dtype']).itemsize for measurement in measurements]
+        bytes_read = OrderedDict((measurement['name'], 0) for measurement in measurements)
+        num_datasets = files = warps = fuses = dask_tasks = 0
+
+        for datasets in sources.values.ravel():
+            for chunk in chunks:
+                chunk_datasets = _intersecting_datasets(datasets, chunk)
+                if dask_chunks is not None:
+                    # One task reading all measurements, plus one per measurement to select it
+                    dask_tasks += len(measurements) + (1 if chunk_datasets else 0)
+
+                num_datasets += len(chunk_datasets)
+                fuses += max(len(chunk_datasets) - 1, 0) * len(measurements)
+                for dataset in chunk_datasets:
+                    files += _count_files(dataset, measurements)
+                    if _needs_warp(dataset, chunk):
+                        warps += len(measurements)
+                    pixels = _source_pixels(dataset, chunk)
+                    for measurement, itemsize in zip(measurements, itemsizes):
+                        bytes_read[measurement['name']] += int(pixels * itemsize)
+
+        return LoadPlan(shape=shape,
+                        output_bytes=int(numpy.prod(shape)) * sum(itemsizes),
+                        datasets=num_datasets,
+                        files=files,
+                        bytes_read=bytes_read,
+                        warps=warps,
+                        fuses=fuses,
+                        dask_tasks=dask_tasks)
 
     @staticmethod
     def measurement_data(sources, geobox, measurement, fuse_func=None, dask_chunks=None):
@@ -617,33 +822,187 @@ class Datacube(object):
         self.close()
 
 
-def fuse_lazy(datasets, geobox, measurement, skip_broken_datasets=False, fuse_func=None, prepend_dims=0):
+def fuse_lazy(datasets, geobox, measurement, skip_broken_datasets=False, fuse_func=None, prepend_dims=0,
+              order_by_overlap=False):
     prepend_shape = (1,) * prepend_dims
-    data = numpy.full(geobox.shape, measurement['nodata'], dtype=measurement['dtype'])
+    data = numpy.empty(geobox.shape, dtype=measurement['dtype'])
     _fuse_measurement(data, datasets, geobox, measurement,
                       skip_broken_datasets=skip_broken_datasets,
-                      fuse_func=fuse_func)
+                      fuse_func=fuse_func,
+                      order_by_overlap=order_by_overlap)
     return data.reshape(prepend_shape + geobox.shape)
 
 
+def _fuse_lazy_measurements(datasets, geobox, measurements, skip_broken_datasets=False, fuse_func=None,
+                            prepend_dims=0, order_by_overlap=False):
+    """
+    Like :func:`fuse_lazy`, but for several measurements at once, returning a list of arrays.
+    """
+    prepend_shape = (1,) * prepend_dims
+    data = [numpy.empty(geobox.shape, dtype=measurement['dtype']) for measurement in measurements]
+    _fuse_measurements(data, datasets, geobox, measurements,
+                       skip_broken_datasets=skip_broken_datasets,
+                       fuse_func=fuse_func,
+                       order_by_overlap=order_by_overlap)
+    return [array.reshape(prepend_shape + geobox.shape) for array in data]
+
+
 def _fuse_measurement(dest, datasets, geobox, measurement,
                       skip_broken_datasets=False,
-                      fuse_func=None):
-    reproject_and_fuse([new_datasource(dataset, measurement['name']) for dataset in datasets],
-                       dest,
-                       geobox.affine,
-                       geobox.crs,
-                       dest.dtype.type(measurement['nodata']),
-                       resampling=measurement.get('resampling_method', 'nearest'),
+                      fuse_func=None,
+                      order_by_overlap=False):
+    _fuse_measurements([dest], datasets, geobox, [measurement],
+                       skip_broken_datasets=skip_broken_datasets,
                        fuse_func=fuse_func,
-                       skip_broken_datasets=skip_broken_datasets)
+                       order_by_overlap=order_by_overlap)
+
+
+def _fuse_measurements(dests, datasets, geobox, measurements,
+                       skip_broken_datasets=False,
+                       fuse_func=None,
+                       order_by_overlap=False):
+    """
+    Fuse `datasets` into one destination array per measurement, opening each source file only once.
+
+    Results are read from, and saved to, the result cache when it is enabled, see
+    :mod:`datacube.storage.result_cache`. Loads skipping broken datasets are not cached, as they may be incomplete.
+    """
+    datasets = _intersecting_datasets(datasets, geobox)
+    if order_by_overlap:
+        datasets = _order_by_overlap(datasets, geobox)
+
+    cache = get_result_cache() if datasets and not skip_broken_datasets else None
+    if cache is not None:
+        keys = [cache.key(datasets, geobox, measurement, fuse_func, order_by_overlap) for measurement in measurements]
+        missing = [index for index, (key, dest) in enumerate(zip(keys, dests))
+                   if key is None or not cache.get(key, dest)]
+        if not missing:
+            return
+        dests = [dests[index] for index in missing]
+        measurements = [measurements[index] for index in missing]
+        keys = [keys[index] for index in missing]
+
+    reproject_and_fuse_bands([[new_datasource(dataset, measurement['name']) for measurement in measurements]
+                              for dataset in datasets],
+                             dests,
+                             geobox.affine,
+                             geobox.crs,
+                             [dest.dtype.type(measurement['nodata']) for dest, measurement in zip(dests, measurements)],
+                             resampling=[measurement.get('resampling_method', 'nearest')
+                                         for measurement in measurements],
+                             fuse_func=fuse_func,
+                             skip_broken_datasets=skip_broken_datasets)
+
+    if cache is not None:
+        for key, dest in zip(keys, dests):
+            if key is not None:
+                cache.put(key, dest, datasets)
+
+
+def _order_by_overlap(datasets, geobox):
+    """
+    Sort `datasets` by the area of `geobox` they cover, largest first.
+
+    Datasets covering the same area keep their relative order.
+    """
+    def overlap(dataset):
+        extent = _dataset_extent(dataset, geobox.crs)
+        if extent is None:
+            return 0
+        return extent.intersection(geobox.extent).area
+
+    return sorted(datasets, key=overlap, reverse=True)
+
+
+def _dataset_extent(dataset, crs):
+    """
+    Extent of `dataset` in `crs`, or None if unknown.
+
+    :rtype: geometry.Geometry
+    """
+    extent = dataset.extent
+    if extent is None:
+        return None
+    return _extent_in_crs(extent, crs)
+
+
+@cachetools.cached(cachetools.LRUCache(maxsize=8192),
+                   key=lambda extent, crs: (extent.wkt, str(extent.crs), str(crs)),
+                   lock=threading.Lock())
+def _extent_in_crs(extent, crs):
+    """
+    `extent` converted to `crs`, or None if it is empty there.
+
+    Cached on the geometry itself rather than the dataset, so updating a dataset can't leave a stale extent.
+    """
+    extent = extent.to_crs(crs)
+    if extent.is_empty:
+        return None
+    return extent
+
+
+def _intersecting_datasets(datasets, geobox):
+    """
+    Drop the datasets that can't contribute any pixel to `geobox`.
+
+    Datasets with an unknown extent are always kept.
+    """
+    # Leave room for the resampling kernel at the edges
+    footprint = geobox.buffered(*(2 * abs(res) for res in geobox.resolution)).extent.prepare()
+
+    def may_intersect(dataset):
+        extent = _dataset_extent(dataset, geobox.crs)
+        return extent is None or intersects(footprint, extent)
+
+    return [dataset for dataset in datasets if may_intersect(dataset)]
+
+
+def _count_files(dataset, measurements):
+    """Number of distinct files to open to read `measurements` of `dataset`"""
+    try:
+        paths = measurement_paths(dataset)
+    except (RuntimeError, KeyError, ValueError):
+        return 1
+    return len({paths.get(measurement['name']) for measurement in measurements})
+
+
+def _storage_resolution(dataset):
+    """(grid spec, resolution) of the product of `dataset`, if known"""
+    grid_spec = dataset.type.grid_spec if dataset.type is not None else None
+    if grid_spec is None or not grid_spec.resolution:
+        return None, None
+    return grid_spec, tuple(grid_spec.resolution)
+
+
+def _needs_warp(dataset, geobox):
+    """Whether reading `dataset` into `geobox` requires a warp, assuming it doesn't when unknown"""
+    crs = dataset.crs
+    if crs is None:
+        return False
+    if crs != geobox.crs:
+        return True
+    _, resolution = _storage_resolution(dataset)
+    return resolution is not None and resolution != tuple(geobox.resolution)
+
+
+def _source_pixels(dataset, geobox):
+    """Estimated number of source pixels of `dataset` covering `geobox`"""
+    extent = _dataset_extent(dataset, geobox.crs)
+    footprint = geobox.extent if extent is None else extent.intersection(geobox.extent)
+
+    grid_spec, resolution = _storage_resolution(dataset)
+    if resolution is None:
+        # Assume the same resolution as the output
+        return footprint.area / abs(geobox.resolution[0] * geobox.resolution[1])
+    return footprint.to_crs(grid_spec.crs).area / abs(resolution[0] * resolution[1])
 
 
 def get_bounds(datasets, crs):
-    left = min([d.extent.to_crs(crs).boundingbox.left for d in datasets])
-    right = max([d.extent.to_crs(crs).boundingbox.right for d in datasets])
-    top = max([d.extent.to_crs(crs).boundingbox.top for d in datasets])
-    bottom = min([d.extent.to_crs(crs).boundingbox.bottom for d in datasets])
+    bounds = [extent.boundingbox for extent in geometry.geometries_to_crs((d.extent for d in datasets), crs)]
+    left = min(bound.left for bound in bounds)
+    right = max(bound.right for bound in bounds)
+    top = max(bound.top for bound in bounds)
+    bottom = min(bound.bottom for bound in bounds)
     return geometry.box(left, bottom, right, top, crs=crs)
 
 
@@ -678,6 +1037,69 @@ def dataset_type_to_row(dt):
     return row
 
 
+def _allocate(shape, measurement, memmap_dir=None):
+    """
+    Create an array for `measurement` filled with its nodata value, in memory or memory mapped to a file in
+    `memmap_dir`.
+    """
+    if memmap_dir is None:
+        return numpy.full(shape, measurement['nodata'], dtype=measurement['dtype'])
+
+    filename = os.path.join(memmap_dir, measurement['name'] + '.npy')
+    if os.path.exists(filename):
+        raise RuntimeError('Output file already exists: %s' % filename)
+
+    _LOG.debug('Loading %s into %s', measurement['name'], filename)
+    data = numpy.lib.format.open_memmap(filename, mode='w+', dtype=measurement['dtype'], shape=shape)
+    data.fill(measurement['nodata'])
+    return data
+
+
+def _iter_prefetched(func, items, prefetch):
+    """
+    Yield `func(item)` for every item, computing up to `prefetch` results ahead in background threads.
+    """
+    if prefetch < 1:
+        for item in items:
+            yield func(item)
+        return
+
+    func = bind_stats(func)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) > prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Don't keep loading if the consumer stopped early
+            for future in pending:
+                future.cancel()
+
+
+def _num_threads(use_threads):
+    """
+    Number of threads to load with, given the `use_threads` argument of :meth:`Datacube.load`.
+    """
+    if use_threads is True:
+        return os.cpu_count() or 1
+    return max(int(use_threads), 1)
+
+
+def _row_blocks(height, num_blocks):
+    """
+    Split `height` rows into `num_blocks` slices of (nearly) equal size.
+
+    :rtype: list[slice]
+    """
+    num_blocks = max(min(int(num_blocks), height), 1)
+    bounds = [height * block // num_blocks for block in range(num_blocks + 1)]
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
 def _chunk_geobox(geobox, chunk_size):
     num_grid_chunks = [int(ceil(s / float(c))) for s, c in zip(geobox.shape, chunk_size)]
     geobox_subsets = {}
@@ -707,11 +1129,22 @@ def _calculate_chunk_sizes(sources, geobox, dask_chunks):
 
 
 # pylint: disable=too-many-locals
-def _make_dask_array(sources, geobox, measurement,
-                     skip_broken_datasets=False,
-                     fuse_func=None,
-                     dask_chunks=None):
-    dsk_name = 'datacube_' + measurement['name']
+def _make_dask_arrays(sources, geobox, measurements,
+                      skip_broken_datasets=False,
+                      fuse_func=None,
+                      dask_chunks=None,
+                      order_by_overlap=False):
+    """
+    Build one :class:`dask.array.Array` per measurement.
+
+    All the measurements of a chunk are loaded by a single task, so every file is opened once per chunk,
+    and the chunks of the per measurement arrays just pick their band from the output of that task.
+
+    :rtype: OrderedDict[str, dask.array.Array]
+    """
+    token = uuid.uuid4().hex
+    fused_name = 'datacube_load-' + token
+    dsk_names = ['datacube_{}-{}'.format(measurement['name'], token) for measurement in measurements]
 
     irr_chunks, grid_chunks = _calculate_chunk_sizes(sources, geobox, dask_chunks)
     sliced_irr_chunks = (1,) * sources.ndim
@@ -721,16 +1154,31 @@ def _make_dask_array(sources, geobox, measurement,
 
     for irr_index, datasets in numpy.ndenumerate(sources.values):
         for grid_index, subset_geobox in geobox_subsets.items():
-            dsk[(dsk_name,) + irr_index + grid_index] = (fuse_lazy,
-                                                         datasets, subset_geobox, measurement,
-                                                         skip_broken_datasets, fuse_func,
-                                                         sources.ndim)
-
-    data = da.Array(dsk, dsk_name,
-                    chunks=(sliced_irr_chunks + grid_chunks),
-                    dtype=measurement['dtype'],
-                    shape=(sources.shape + geobox.shape))
-
-    if irr_chunks != sliced_irr_chunks:
-        data = data.rechunk(chunks=(irr_chunks + grid_chunks))
-    return data
+            chunk_index = irr_index + grid_index
+            subset_datasets = _intersecting_datasets(datasets, subset_geobox)
+            if not subset_datasets:
+                # Nothing to read, no need for any IO
+                for dsk_name, measurement in zip(dsk_names, measurements):
+                    dsk[(dsk_name,) + chunk_index] = (numpy.full,
+                                                      sliced_irr_chunks + subset_geobox.shape,
+                                                      measurement['nodata'], measurement['dtype'])
+                continue
+
+            dsk[(fused_name,) + chunk_index] = (_fuse_lazy_measurements,
+                                                subset_datasets, subset_geobox, measurements,
+                                                skip_broken_datasets, fuse_func,
+                                                sources.ndim, order_by_overlap)
+            for band, dsk_name in enumerate(dsk_names):
+                dsk[(dsk_name,) + chunk_index] = (operator.getitem, (fused_name,) + chunk_index, band)
+
+    arrays = OrderedDict()
+    for dsk_name, measurement in zip(dsk_names, measurements):
+        data = da.Array(dsk, dsk_name,
+                        chunks=(sliced_irr_chunks + grid_chunks),
+                        dtype=measurement['dtype'],
+                        shape=(sources.shape + geobox.shape))
+
+        if irr_chunks != sliced_irr_chunks:
+            data = data.rechunk(chunks=(irr_chunks + grid_chunks))
+        arrays[measurement['name']] = data
+    return arrays
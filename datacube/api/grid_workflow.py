@@ -189,8 +189,9 @@ class GridWorkflow(object):
             geobox = geobox.buffered(*tile_buffer) if tile_buffer else geobox
 
             datasets, query = self._find_datasets(geobox.extent, indexers)
+            tile_extent = geobox.extent.prepare()
             for dataset in datasets:
-                if intersects(geobox.extent, dataset.extent.to_crs(self.grid_spec.crs)):
+                if intersects(tile_extent, dataset.extent.to_crs(self.grid_spec.crs)):
                     add_dataset_to_cells(cell_index, geobox, dataset)
             return cells
         else:
@@ -198,18 +199,16 @@ class GridWorkflow(object):
 
             if query.geopolygon:
                 # Get a rough region of tiles
-                query_tiles = set(
-                    tile_index for tile_index, tile_geobox in
-                    self.grid_spec.tiles_inside_geopolygon(query.geopolygon))
+                query_tiles = set(map(tuple, self.grid_spec.tile_indices_inside_geopolygon(
+                    query.geopolygon).tolist()))
 
                 for dataset in datasets:
                     # Go through our datasets and see which tiles each dataset produces, and whether they intersect
-                    # our query geopolygon.
-                    dataset_extent = dataset.extent.to_crs(self.grid_spec.crs)
-                    for tile_index, tile_geobox in self.grid_spec.tiles(
-                            dataset_extent.boundingbox.buffered(*tile_buffer)):
-                        if tile_index in query_tiles and intersects(tile_geobox.extent, dataset_extent):
-                            add_dataset_to_cells(tile_index, tile_geobox, dataset)
+                    # our query geopolygon. GeoBoxes are only made for the tiles that are used.
+                    for tile_index in self.grid_spec.tile_indices_inside_geopolygon(dataset.extent).tolist():
+                        tile_index = tuple(tile_index)
+                        if tile_index in query_tiles:
+                            add_dataset_to_cells(tile_index, self.grid_spec.tile_geobox(tile_index), dataset)
 
             else:
                 for dataset in datasets:
@@ -379,6 +378,24 @@ class GridWorkflow(object):
 
         return dataset
 
+    @staticmethod
+    def plan_load(tile, measurements=None, dask_chunks=None, resampling=None):
+        """
+        Estimate the cost of loading a cell/tile with :meth:`load`, without reading any data.
+
+        :param `.Tile` tile: The tile to load.
+        :param list(str) measurements: The names of measurements to load
+        :param dict dask_chunks: If provided, estimate the cost of a lazy load with these chunks
+        :param str resampling: The resampling method to use if re-projection is required.
+        :rtype: datacube.api.core.LoadPlan
+
+        .. seealso:: :meth:`load` :meth:`datacube.Datacube.plan_load`
+        """
+        measurements = tile.product.lookup_measurements(measurements)
+        measurements = set_resampling_method(measurements, resampling)
+
+        return Datacube.plan_load_data(tile.sources, tile.geobox, measurements.values(), dask_chunks=dask_chunks)
+
     def update_tile_lineage(self, tile):
         for i in range(tile.sources.size):
             sources = tile.sources.values[i]
@@ -140,15 +140,42 @@ class LocalConfig(object):
         return str(self)
 
 
-OPTIONS = {'reproject_threads': 4}
+OPTIONS = {
+    'reproject_threads': 4,
+    'file_handle_cache_size': 0,
+    'file_handle_idle_timeout': 60,
+    'overview_resampling': ('average', 'bilinear', 'cubic', 'cubic_spline', 'lanczos'),
+    'concurrent_reads': 0,
+    'result_cache_dir': None,
+    'result_cache_max_bytes': 10 * 1024 ** 3,
+    'warp_plan_cache_bytes': 0,
+    'scratch_buffer_bytes': 256 * 1024 ** 2,
+}
 
 
 #: pylint: disable=invalid-name
 class set_options(object):
     """Set global state within a controlled context
 
-    Currently, the only supported options are:
+    Currently, the supported options are:
+
     * reproject_threads: The number of threads to use when reprojecting
+    * file_handle_cache_size: The maximum number of idle open files to keep around for re-use
+      across reads. Defaults to 0, which disables the cache.
+    * file_handle_idle_timeout: Close cached files that have not been used for this many seconds
+    * overview_resampling: Resampling methods allowed to read from overviews when loading at a coarser
+      resolution than the source. ``nearest`` isn't included by default, as overviews are usually built
+      by averaging, which doesn't suit categorical data.
+    * concurrent_reads: Maximum number of datasets to read at the same time when fusing, useful when reading
+      remote (eg. HTTP or S3) files. Defaults to 0, reading datasets one after the other.
+    * result_cache_dir: Directory in which to cache the results of loads, for reuse by later loads of the same
+      data. Defaults to None, which disables the cache. See :mod:`datacube.storage.result_cache`.
+    * result_cache_max_bytes: Maximum size of the result cache, 10GiB by default
+    * warp_plan_cache_bytes: Memory to use for keeping the source pixel of every output pixel of nearest neighbour
+      reprojections, so that reprojecting again between the same grids is a numpy lookup. Helps when many
+      datasets share a grid, eg. when ingesting. Defaults to 0, which disables the cache.
+    * scratch_buffer_bytes: Memory each thread of a load may keep in buffers reused when fusing datasets, freed
+      once the load finishes. Defaults to 256MiB, 0 allocates new buffers every time.
 
     You can use ``set_options`` either as a context manager::
 
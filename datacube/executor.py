@@ -13,7 +13,15 @@
 
 from __future__ import absolute_import, division
 
+import os
+import shutil
 import sys
+import tempfile
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+import numpy
 import six
 
 _REMOTE_LOG_FORMAT_STRING = '%(asctime)s {} %(process)d %(name)s %(levelname)s %(message)s'
@@ -151,7 +159,163 @@ def _run_cloud_pickled_function(f_data, *args, **kwargs):
     return func(*args, **kwargs)
 
 
-def _get_concurrent_executor(workers, use_cloud_pickle=False):
+#: Arrays of at least this many bytes are returned through shared memory, when enabled
+SHARED_RESULT_MIN_BYTES = 1024 * 1024
+
+
+class _SharedArray(object):
+    """Handle to a numpy array written by a worker process to a memory mapped ``.npy`` file"""
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self):
+        return numpy.load(self.filename, mmap_mode='r+')
+
+    def filenames(self):
+        return [self.filename]
+
+
+class _SharedDataset(object):
+    """Handle to an :class:`xarray.Dataset` with its large variables in shared memory"""
+    def __init__(self, template, names, shared):
+        self.template = template
+        self.names = names
+        self.shared = shared
+
+    def load(self):
+        import xarray
+        data_vars = OrderedDict()
+        for name in self.names:
+            if name in self.shared:
+                dims, array, attrs, encoding = self.shared[name]
+                data_vars[name] = xarray.Variable(dims, array.load(), attrs, encoding)
+            else:
+                data_vars[name] = self.template.data_vars[name].variable
+        return xarray.Dataset(data_vars, coords=self.template.coords, attrs=self.template.attrs)
+
+    def filenames(self):
+        return [array.filename for _, array, _, _ in self.shared.values()]
+
+
+class _SharedDataArray(object):
+    """Handle to an :class:`xarray.DataArray` with its data in shared memory"""
+    def __init__(self, name, dims, coords, attrs, encoding, array):
+        self.name = name
+        self.dims = dims
+        self.coords = coords
+        self.attrs = attrs
+        self.encoding = encoding
+        self.array = array
+
+    def load(self):
+        import xarray
+        result = xarray.DataArray(self.array.load(), coords=self.coords.coords, dims=self.dims,
+                                  name=self.name, attrs=self.attrs)
+        result.encoding = self.encoding
+        return result
+
+    def filenames(self):
+        return self.array.filenames()
+
+
+_SHARED_TYPES = (_SharedArray, _SharedDataset, _SharedDataArray)
+
+
+def _share_array(array, directory, min_bytes):
+    """
+    Write `array` to a memory mapped file in `directory`.
+
+    :return: a :class:`_SharedArray`, or None if `array` is too small or can't be memory mapped
+    """
+    if not isinstance(array, numpy.ndarray) or array.nbytes < min_bytes or array.dtype.hasobject:
+        return None
+
+    fd, filename = tempfile.mkstemp(suffix='.npy', dir=directory)
+    os.close(fd)
+    shared = numpy.lib.format.open_memmap(filename, mode='w+', dtype=array.dtype, shape=array.shape)
+    shared[...] = array
+    shared.flush()
+    del shared
+    return _SharedArray(filename)
+
+
+def _share_results(value, directory, min_bytes):
+    """
+    Replace the large numpy arrays within `value`, including the data of xarray objects, with handles
+    to memory mapped files in `directory`.
+
+    Lists, tuples and dicts are searched recursively, other values are returned unchanged.
+    """
+    if isinstance(value, numpy.ndarray):
+        return _share_array(value, directory, min_bytes) or value
+
+    try:
+        import xarray
+    except ImportError:
+        xarray = None
+
+    if xarray is not None and isinstance(value, xarray.Dataset):
+        shared = OrderedDict()
+        for name, var in value.data_vars.items():
+            array = _share_array(var.data, directory, min_bytes)
+            if array is not None:
+                shared[name] = (var.dims, array, var.attrs, var.encoding)
+        if not shared:
+            return value
+        template = value.copy(deep=False)
+        for name in shared:
+            del template[name]
+        return _SharedDataset(template, list(value.data_vars), shared)
+
+    if xarray is not None and isinstance(value, xarray.DataArray):
+        array = _share_array(value.data, directory, min_bytes)
+        if array is None:
+            return value
+        return _SharedDataArray(value.name, value.dims, value.coords.to_dataset(),
+                                value.attrs, value.encoding, array)
+
+    if type(value) in (list, tuple):
+        return type(value)(_share_results(item, directory, min_bytes) for item in value)
+    if type(value) is dict:
+        return {key: _share_results(item, directory, min_bytes) for key, item in value.items()}
+    return value
+
+
+def _map_shared(value, func):
+    """Replace every shared memory handle within `value` with ``func(handle)``"""
+    if isinstance(value, _SHARED_TYPES):
+        return func(value)
+    if type(value) in (list, tuple):
+        return type(value)(_map_shared(item, func) for item in value)
+    if type(value) is dict:
+        return {key: _map_shared(item, func) for key, item in value.items()}
+    return value
+
+
+def _load_shared(value):
+    return _map_shared(value, lambda handle: handle.load())
+
+
+def _remove_shared(handle):
+    for filename in handle.filenames():
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+def _run_sharing_results(directory, min_bytes, func, *args, **kwargs):
+    return _share_results(func(*args, **kwargs), directory, min_bytes)
+
+
+def _shared_memory_directory():
+    """Directory for results shared by worker processes, in memory rather than on disk where possible"""
+    shm = '/dev/shm'
+    return tempfile.mkdtemp(prefix='datacube-results-', dir=shm if os.path.isdir(shm) else None)
+
+
+def _get_concurrent_executor(workers, use_cloud_pickle=False, shared_memory_results=False,
+                             shared_memory_min_bytes=SHARED_RESULT_MIN_BYTES):
     try:
         from concurrent.futures import ProcessPoolExecutor, as_completed
     except ImportError:
@@ -168,15 +332,21 @@ def _get_concurrent_executor(workers, use_cloud_pickle=False):
         return submit_cloud_pickle if use_cloud_pickle else submit_direct
 
     class MultiprocessingExecutor(object):
-        def __init__(self, pool, use_cloud_pickle):
+        def __init__(self, pool, use_cloud_pickle, shared_memory_results=False):
             self._pool = pool
             self._submitter = mk_submitter(pool, use_cloud_pickle)
+            self._shared_directory = None
+            if shared_memory_results:
+                self._shared_directory = _shared_memory_directory()
+                weakref.finalize(self, shutil.rmtree, self._shared_directory, True)
 
         def __repr__(self):
             max_workers = self._pool.__dict__.get('_max_workers', '??')
             return 'Multiprocessing ({})'.format(max_workers)
 
         def submit(self, func, *args, **kwargs):
+            if self._shared_directory is not None:
+                func = partial(_run_sharing_results, self._shared_directory, shared_memory_min_bytes, func)
             return self._submitter(func, *args, **kwargs)
 
         def map(self, func, iterable):
@@ -212,29 +382,36 @@ def _get_concurrent_executor(workers, use_cloud_pickle=False):
 
         @staticmethod
         def results(futures):
-            return [future.result() for future in futures]
+            return [_load_shared(future.result()) for future in futures]
 
         @staticmethod
         def result(future):
-            return future.result()
+            return _load_shared(future.result())
 
         @staticmethod
         def release(future):
-            pass
+            """Free the shared memory of the result of `future`, which must no longer be used"""
+            if future.done() and not future.cancelled() and future.exception() is None:
+                _map_shared(future.result(), _remove_shared)
 
     if workers <= 0:
         return None
 
-    return MultiprocessingExecutor(ProcessPoolExecutor(workers), use_cloud_pickle)
+    return MultiprocessingExecutor(ProcessPoolExecutor(workers), use_cloud_pickle, shared_memory_results)
 
 
-def get_executor(scheduler, workers, use_cloud_pickle=True):
+def get_executor(scheduler, workers, use_cloud_pickle=True, shared_memory_results=False):
     """
     Return a task executor based on input parameters. Falling back as required.
 
     :param scheduler: IP address and port of a distributed.Scheduler, or a Scheduler instance
     :param workers: Number of processes to start for process based parallel execution
     :param use_cloud_pickle: Only applies when scheduler is None and workers > 0, default is True
+    :param shared_memory_results: Only applies when scheduler is None and workers > 0.
+        Workers return large numpy arrays, including the data of xarray objects, through memory mapped
+        files (in ``/dev/shm`` where available) instead of pickling them back to the parent process,
+        where they are mapped without a copy. Call ``release(future)`` once a result is no longer used to
+        free its memory, otherwise it is freed when the executor is garbage collected.
     """
     if not workers:
         return SerialExecutor()
@@ -244,7 +421,8 @@ def get_executor(scheduler, workers, use_cloud_pickle=True):
         if distributed_exec:
             return distributed_exec
 
-    concurrent_exec = _get_concurrent_executor(workers, use_cloud_pickle=use_cloud_pickle)
+    concurrent_exec = _get_concurrent_executor(workers, use_cloud_pickle=use_cloud_pickle,
+                                               shared_memory_results=shared_memory_results)
     if concurrent_exec:
         return concurrent_exec
 
@@ -11,6 +11,7 @@ from uuid import UUID
 
 from datacube import compat
 from datacube.model import Dataset, DatasetType
+from datacube.storage.result_cache import invalidate_datasets
 from datacube.utils import jsonify_document, changes
 from datacube.utils.changes import get_doc_changes, check_doc_unchanged
 from . import fields
@@ -261,6 +262,7 @@ class DatasetResource(object):
         finally:
             dataset.metadata.sources = sources_tmp
 
+        invalidate_datasets([dataset.id])
         return dataset
 
     def _ensure_new_locations(self, dataset, existing):
@@ -279,9 +281,11 @@ class DatasetResource(object):
 
         :param list[UUID] ids: list of dataset ids to archive
         """
+        ids = list(ids)
         with self._db.begin() as transaction:
             for id_ in ids:
                 transaction.archive_dataset(id_)
+        invalidate_datasets(ids)
 
     def restore(self, ids):
         """
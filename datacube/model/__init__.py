@@ -11,7 +11,9 @@ from collections import namedtuple, OrderedDict, Sequence
 from pathlib import Path
 from uuid import UUID
 
+import numpy
 from affine import Affine
+from rasterio.features import rasterize
 
 from datacube.compat import urlparse
 from datacube.utils import geometry
@@ -527,6 +529,20 @@ class SpectralDefinition(object):
         self.spec_def_dict = spec_def_dict
 
 
+def _dilate(mask, rows, columns):
+    """
+    Grow the True areas of a 2D boolean `mask` by `rows` and `columns` cells in each direction
+    """
+    grown = mask.copy()
+    for _ in range(rows):
+        grown[1:] |= grown[:-1].copy()
+        grown[:-1] |= grown[1:].copy()
+    for _ in range(columns):
+        grown[:, 1:] |= grown[:, :-1].copy()
+        grown[:, :-1] |= grown[:, 1:].copy()
+    return grown
+
+
 class GridSpec(object):
     """
     Definition for a regular spatial grid
@@ -647,14 +663,71 @@ class GridSpec(object):
         :return: iterator of grid cells with :py:class:`GeoBox` tiles
         """
         result = []
+        for tile_index in self.tile_indices_inside_geopolygon(geopolygon, tile_buffer=tile_buffer).tolist():
+            tile_index = tuple(tile_index)
+            tile_geobox = self.tile_geobox(tile_index)
+            if tile_buffer:
+                tile_geobox = tile_geobox.buffered(*tile_buffer)
+            result.append((tile_index, tile_geobox))
+        return result
+
+    def tile_indices_inside_geopolygon(self, geopolygon, tile_buffer=(0, 0)):
+        """
+        Indices of the tiles returned by :meth:`tiles_inside_geopolygon`, without creating their GeoBoxes.
+
+        The polygon is rasterised onto the grid of tiles. Tiles with their centre inside it are selected
+        directly, only the tiles along its boundary are tested against it one by one.
+
+        :param geometry.Geometry geopolygon: Polygon to tile
+        :param tile_buffer:
+        :return: (x, y) tile indices, one per row, ordered like :meth:`tiles`
+        :rtype: numpy.ndarray
+        """
         geopolygon = geopolygon.to_crs(self.crs)
-        for tile_index, tile_geobox in self.tiles(geopolygon.boundingbox.buffered(*tile_buffer)):
+        no_tiles = numpy.empty((0, 2), dtype='int64')
+        if geopolygon.is_empty:
+            return no_tiles
+
+        tile_size_y, tile_size_x = self.tile_size
+        origin_y, origin_x = self.origin
+        bounds = geopolygon.boundingbox.buffered(*tile_buffer)
+        ys = numpy.array(GridSpec.grid_range(bounds.bottom - origin_y, bounds.top - origin_y, tile_size_y))
+        xs = numpy.array(GridSpec.grid_range(bounds.left - origin_x, bounds.right - origin_x, tile_size_x))
+        if ys.size == 0 or xs.size == 0:
+            return no_tiles
+
+        # Raster with one north-up pixel per tile
+        left = origin_x + min(xs[0] * tile_size_x, (xs[-1] + 1) * tile_size_x)
+        top = origin_y + max(ys[0] * tile_size_y, (ys[-1] + 1) * tile_size_y)
+        transform = Affine(abs(tile_size_x), 0.0, left, 0.0, -abs(tile_size_y), top)
+        column_index = xs if tile_size_x > 0 else xs[::-1]
+        row_index = ys[::-1] if tile_size_y > 0 else ys
+
+        def burn(all_touched):
+            return rasterize([geopolygon.__geo_interface__], out_shape=(row_index.size, column_index.size),
+                             transform=transform, all_touched=all_touched, dtype='uint8').astype(bool)
+
+        # Tiles with their centre inside a polygon certainly overlap it. Other candidates are the tiles it
+        # touches, and their neighbours in case of rounding errors and within the buffer
+        if geopolygon.type in ('Polygon', 'MultiPolygon'):
+            inside = burn(all_touched=False)
+        else:
+            inside = numpy.zeros((row_index.size, column_index.size), dtype=bool)
+        candidates = _dilate(burn(all_touched=True),
+                             1 + int(abs(tile_buffer[0]) // abs(tile_size_y)),
+                             1 + int(abs(tile_buffer[1]) // abs(tile_size_x)))
+
+        selected = inside.copy()
+        prepared = geopolygon.prepare()
+        for row, column in zip(*numpy.nonzero(candidates & ~inside)):
+            tile_geobox = self.tile_geobox((column_index[column], row_index[row]))
             if tile_buffer:
                 tile_geobox = tile_geobox.buffered(*tile_buffer)
+            selected[row, column] = intersects(prepared, tile_geobox.extent)
 
-            if intersects(tile_geobox.extent, geopolygon):
-                result.append((tile_index, tile_geobox))
-        return result
+        rows, columns = numpy.nonzero(selected)
+        indices = numpy.column_stack((column_index[columns], row_index[rows])).astype('int64')
+        return indices[numpy.lexsort((indices[:, 0], indices[:, 1]))]
 
     @staticmethod
     def grid_range(lower, upper, step):
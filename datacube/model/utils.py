@@ -46,17 +46,16 @@ def machine_info():
 def geobox_info(extent, valid_data=None):
     image_bounds = extent.boundingbox
     data_bounds = valid_data.boundingbox if valid_data else image_bounds
-    ul = geometry.point(data_bounds.left, data_bounds.top, crs=extent.crs).to_crs(geometry.CRS('EPSG:4326'))
-    ur = geometry.point(data_bounds.right, data_bounds.top, crs=extent.crs).to_crs(geometry.CRS('EPSG:4326'))
-    lr = geometry.point(data_bounds.right, data_bounds.bottom, crs=extent.crs).to_crs(geometry.CRS('EPSG:4326'))
-    ll = geometry.point(data_bounds.left, data_bounds.bottom, crs=extent.crs).to_crs(geometry.CRS('EPSG:4326'))
+    lons, lats = geometry.transform_points([data_bounds.left, data_bounds.right, data_bounds.right, data_bounds.left],
+                                           [data_bounds.top, data_bounds.top, data_bounds.bottom, data_bounds.bottom],
+                                           extent.crs, geometry.CRS('EPSG:4326'))
     doc = {
         'extent': {
             'coord': {
-                'ul': {'lon': ul.points[0][0], 'lat': ul.points[0][1]},
-                'ur': {'lon': ur.points[0][0], 'lat': ur.points[0][1]},
-                'lr': {'lon': lr.points[0][0], 'lat': lr.points[0][1]},
-                'll': {'lon': ll.points[0][0], 'lat': ll.points[0][1]},
+                'ul': {'lon': float(lons[0]), 'lat': float(lats[0])},
+                'ur': {'lon': float(lons[1]), 'lat': float(lats[1])},
+                'lr': {'lon': float(lons[2]), 'lat': float(lats[2])},
+                'll': {'lon': float(lons[3]), 'lat': float(lats[3])},
             }
         },
         'grid_spatial': {
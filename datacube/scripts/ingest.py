@@ -20,6 +20,7 @@ from datacube.ui import click as ui
 from datacube.utils import read_documents
 from datacube.ui.task_app import check_existing_files, load_tasks as load_tasks_, save_tasks as save_tasks_
 from datacube.drivers import storage_writer_by_name
+from datacube.storage.fusers import get_fuser
 
 from datacube.ui.click import cli
 
@@ -216,7 +217,7 @@ def ingest_work(config, source_type, output_type, tile, tile_index):
     global_attributes = config['global_attributes']
 
     with datacube.set_options(reproject_threads=1):
-        fuse_func = {'copy': None}[config.get(FUSER_KEY, 'copy')]
+        fuse_func = get_fuser(config.get(FUSER_KEY, 'copy'))
         data = Datacube.load_data(tile.sources, tile.geobox, measurements, fuse_func=fuse_func)
 
     nudata = data.rename(namemap)
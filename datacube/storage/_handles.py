@@ -0,0 +1,159 @@
+"""
+Process-wide cache of open file handles, used to avoid re-opening the same file for every read.
+
+See :func:`datacube.storage.storage.file_handle_cache_info`.
+"""
+from __future__ import absolute_import
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+_LOG = logging.getLogger(__name__)
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'size', 'maxsize'])
+
+
+class HandleCache(object):
+    """
+    Bounded LRU cache of idle open file handles, keyed by filename.
+
+    A handle is checked out of the cache while it is in use, so a single handle (and the GDAL dataset
+    behind it) is never used by two threads at once: concurrent readers of the same file each get their
+    own handle, and every handle goes back into the cache once released.
+
+    Handles left idle for longer than `idle_timeout` seconds are closed on the next cache access.
+    A forked child process starts over with an empty cache, it never reuses handles of its parent.
+
+    :param opener: function opening a file, eg. :func:`rasterio.open`
+    """
+
+    def __init__(self, opener):
+        self._opener = opener
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        #: filename -> list of (handle, time released), least recently used filename first
+        self._idle = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Handles (and possibly a held lock) inherited from the parent process, don't touch them
+            self._reset()
+
+    @contextmanager
+    def open(self, filename, maxsize, idle_timeout=None):
+        """
+        Context manager returning an open handle for `filename`, re-using an idle one when possible.
+
+        :param str filename: file to open
+        :param int maxsize: maximum number of idle handles to keep open
+        :param float idle_timeout: close handles that have not been used for this many seconds
+        """
+        handle = self._acquire(filename, idle_timeout)
+        succeeded = False
+        try:
+            yield handle
+            succeeded = True
+        finally:
+            if succeeded:
+                self._release(filename, handle, maxsize, idle_timeout)
+            else:
+                # Don't put a handle in an unknown state back in the cache
+                _close_all([handle])
+
+    def _acquire(self, filename, idle_timeout):
+        self._check_pid()
+        with self._lock:
+            expired = self._expire(idle_timeout)
+            handles = self._idle.get(filename)
+            handle = None
+            if handles:
+                handle, _ = handles.pop()
+                self._size -= 1
+                if not handles:
+                    del self._idle[filename]
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        _close_all(expired)
+        if handle is None:
+            handle = self._opener(filename)
+        return handle
+
+    def _release(self, filename, handle, maxsize, idle_timeout):
+        self._check_pid()
+        with self._lock:
+            self._idle.setdefault(filename, []).append((handle, time.time()))
+            self._idle.move_to_end(filename)
+            self._size += 1
+            expired = self._expire(idle_timeout)
+            expired.extend(self._evict(maxsize))
+
+        _close_all(expired)
+
+    def _expire(self, idle_timeout):
+        """Remove handles idle for longer than `idle_timeout`, must be called with the lock held"""
+        expired = []
+        if not idle_timeout:
+            return expired
+
+        oldest_allowed = time.time() - idle_timeout
+        for filename in list(self._idle):
+            handles = self._idle[filename]
+            keep = [(handle, released) for handle, released in handles if released >= oldest_allowed]
+            expired.extend(handle for handle, released in handles if released < oldest_allowed)
+            if keep:
+                self._idle[filename] = keep
+            else:
+                del self._idle[filename]
+        self._size -= len(expired)
+        return expired
+
+    def _evict(self, maxsize):
+        """Remove least recently used handles beyond `maxsize`, must be called with the lock held"""
+        evicted = []
+        while self._size > maxsize:
+            filename, handles = next(iter(self._idle.items()))
+            handle, _ = handles.pop(0)
+            if not handles:
+                del self._idle[filename]
+            self._size -= 1
+            evicted.append(handle)
+        return evicted
+
+    def clear(self):
+        """Close all idle handles and reset the hit/miss counters"""
+        self._check_pid()
+        with self._lock:
+            handles = [handle for entries in self._idle.values() for handle, _ in entries]
+            self._idle.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+        _close_all(handles)
+
+    def info(self, maxsize):
+        """
+        :param int maxsize: configured maximum number of idle handles
+        :rtype: CacheInfo
+        """
+        self._check_pid()
+        return CacheInfo(hits=self.hits, misses=self.misses, size=self._size, maxsize=maxsize)
+
+
+def _close_all(handles):
+    for handle in handles:
+        try:
+            handle.close()
+        except Exception as e:  # pylint: disable=broad-except
+            _LOG.warning('Failed to close cached file handle: %s', e)
@@ -0,0 +1,170 @@
+# coding=utf-8
+"""
+Fusers combining the data of overlapping datasets into a single array.
+
+Besides plain functions fusing two arrays at a time (like :func:`datacube.helpers.ga_pq_fuser`), a `fuse_func`
+can be a :class:`StackedFuser`, which gets the data of all the datasets of a group at once, as a
+``(n_sources, y, x)`` stack, and reduces it in a single vectorised pass.
+
+The fusers in :data:`FUSERS` can also be selected by name, eg. ``dc.load(..., fuse_func='max')`` or
+``fuse_data: median`` in an ingestion config.
+"""
+from __future__ import absolute_import, division
+
+import warnings
+
+import numpy
+
+from datacube.compat import string_types
+
+
+class StackedFuser(object):
+    """
+    Base class for fusers reducing the data of all the sources of a group at once.
+
+    Subclasses implement :meth:`reduce`.
+    """
+
+    def reduce(self, stack, nodata, dest):
+        """
+        Fuse `stack` into `dest`.
+
+        :param numpy.ndarray stack: ``(n_sources, y, x)`` array, holding the data of every source in fusing
+                                    order, with `nodata` where a source has no data
+        :param nodata: nodata value of `stack` and `dest`
+        :param numpy.ndarray dest: ``(y, x)`` array to write the result into
+        """
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return '{}()'.format(self.__class__.__name__)
+
+
+def _valid_mask(stack, nodata):
+    if numpy.isnan(nodata):
+        return ~numpy.isnan(stack)
+    return stack != nodata
+
+
+class FirstValidFuser(StackedFuser):
+    """Take the first valid value of every pixel, like the default fuser"""
+
+    def reduce(self, stack, nodata, dest):
+        _first_valid(stack, nodata, dest)
+
+
+class LastValidFuser(StackedFuser):
+    """Take the last valid value of every pixel"""
+
+    def reduce(self, stack, nodata, dest):
+        _first_valid(stack[::-1], nodata, dest)
+
+
+def _first_valid(stack, nodata, dest):
+    valid = _valid_mask(stack, nodata)
+    first = valid.argmax(axis=0)
+    rows, cols = numpy.ogrid[:dest.shape[0], :dest.shape[1]]
+    dest[:] = stack[first, rows, cols]
+    # argmax is 0 where there is no valid value, which is already nodata
+
+
+def _extreme_value(dtype, largest):
+    dtype = numpy.dtype(dtype)
+    if dtype.kind == 'f':
+        return dtype.type(numpy.inf if largest else -numpy.inf)
+    info = numpy.iinfo(dtype)
+    return dtype.type(info.max if largest else info.min)
+
+
+class MinFuser(StackedFuser):
+    """Take the smallest valid value of every pixel"""
+
+    def reduce(self, stack, nodata, dest):
+        valid = _valid_mask(stack, nodata)
+        numpy.amin(numpy.where(valid, stack, _extreme_value(stack.dtype, largest=True)), axis=0, out=dest)
+        numpy.copyto(dest, nodata, where=~valid.any(axis=0))
+
+
+class MaxFuser(StackedFuser):
+    """Take the largest valid value of every pixel"""
+
+    def reduce(self, stack, nodata, dest):
+        valid = _valid_mask(stack, nodata)
+        numpy.amax(numpy.where(valid, stack, _extreme_value(stack.dtype, largest=False)), axis=0, out=dest)
+        numpy.copyto(dest, nodata, where=~valid.any(axis=0))
+
+
+class MedianFuser(StackedFuser):
+    """Take the median of the valid values of every pixel, rounded to the nearest integer for integer types"""
+
+    def reduce(self, stack, nodata, dest):
+        valid = _valid_mask(stack, nodata)
+        values = numpy.where(valid, stack, numpy.nan)
+        with warnings.catch_warnings():
+            # All-NaN slices are expected, where no source is valid
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            median = numpy.nanmedian(values, axis=0)
+        if dest.dtype.kind != 'f':
+            median = numpy.around(median)
+        numpy.copyto(dest, median, casting='unsafe', where=valid.any(axis=0))
+        numpy.copyto(dest, nodata, where=~valid.any(axis=0))
+
+
+class MaskPriorityFuser(StackedFuser):
+    """
+    Fuse pixel quality bitmasks, where a pixel is valid when its `valid_bit` is set.
+
+    Combines the valid values of every pixel with a bitwise AND, so a test only passes if it passes in every
+    source with valid data. Pixels with no valid source take the value of the last source.
+    Vectorised equivalent of :func:`datacube.helpers.ga_pq_fuser`.
+
+    :param int valid_bit: index of the bit flagging valid pixels
+    """
+
+    def __init__(self, valid_bit=8):
+        self.valid_bit = valid_bit
+
+    def reduce(self, stack, nodata, dest):
+        valid = (stack & (1 << self.valid_bit)).astype(bool)
+        all_bits = numpy.array(-1).astype(stack.dtype)
+        numpy.bitwise_and.reduce(numpy.where(valid, stack, all_bits), axis=0, out=dest)
+        numpy.copyto(dest, stack[-1], where=~valid.any(axis=0))
+
+    def __repr__(self):
+        return '{}(valid_bit={})'.format(self.__class__.__name__, self.valid_bit)
+
+
+#: Fusers available by name. ``'copy'`` is the default fuser, copying in valid data until the output is complete
+FUSERS = {
+    'copy': None,
+    'first': FirstValidFuser(),
+    'last': LastValidFuser(),
+    'min': MinFuser(),
+    'max': MaxFuser(),
+    'median': MedianFuser(),
+    'ga_pq': MaskPriorityFuser(valid_bit=8),
+}
+
+
+def register_fuser(name, fuser):
+    """
+    Make `fuser` available by `name`, eg. for use in ingestion configs.
+
+    :param str name: name to select the fuser with
+    :param fuser: :class:`StackedFuser` instance, or function fusing two arrays
+    """
+    FUSERS[name] = fuser
+
+
+def get_fuser(fuse_func):
+    """
+    Resolve a `fuse_func` argument, which may be the name of a fuser in :data:`FUSERS`.
+
+    :param fuse_func: fuser name, :class:`StackedFuser`, function fusing two arrays, or None for the default
+    """
+    if isinstance(fuse_func, string_types):
+        try:
+            return FUSERS[fuse_func]
+        except KeyError:
+            raise ValueError('Unknown fuser {!r}, valid names are: {}'.format(fuse_func, ', '.join(sorted(FUSERS))))
+    return fuse_func
@@ -0,0 +1,317 @@
+# coding=utf-8
+"""
+Persistent on-disk cache of fused load results.
+
+Enabled with ``datacube.set_options(result_cache_dir='/path/to/cache')``, the 2D arrays produced by fusing the
+datasets of a group for a measurement are stored as ``.npy`` files, and reused by later loads of the same
+datasets, geobox, measurement, resampling method and fuser. The least recently used entries are removed once
+the cache grows beyond the `result_cache_max_bytes` option.
+
+Keys include a hash of the document and locations of every dataset, so entries built from an older version of a
+dataset are never used, even when it was updated by another process. Entries built from a dataset are also dropped
+when it is archived or updated in the index through a process using the same cache directory.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import types
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy
+
+from datacube.compat import string_types
+from datacube.config import OPTIONS
+from datacube.storage.fusers import StackedFuser
+
+_LOG = logging.getLogger(__name__)
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'entries', 'size', 'maxsize'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entry_dataset (
+    key TEXT NOT NULL REFERENCES entry (key) ON DELETE CASCADE,
+    dataset_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entry_dataset_id ON entry_dataset (dataset_id);
+CREATE INDEX IF NOT EXISTS entry_dataset_key ON entry_dataset (key);
+"""
+
+#: Seconds between updates of the last use time of an entry, so that most cache hits don't write to the database
+_TOUCH_INTERVAL = 60
+
+
+class ResultCache(object):
+    """
+    Cache of fused 2D arrays in a directory, with an sqlite database keeping track of the entries.
+
+    Safe to use from several threads and processes at once.
+
+    :param str directory: directory to store the cache in, created if needed
+    :param int max_bytes: maximum total size of the cached arrays
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with self._connect() as db:
+            # Readers aren't blocked by writers in write-ahead logging mode
+            db.execute('PRAGMA journal_mode = WAL')
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self, timeout=60):
+        """
+        Connection of the current thread to the index database, committing (or rolling back) on exit.
+
+        :param timeout: seconds to wait for other connections writing to the database
+        """
+        pid, db = getattr(self._local, 'connection', (None, None))
+        if pid != os.getpid():
+            # Each thread keeps its own connection, and connections aren't carried across a fork
+            db = sqlite3.connect(os.path.join(self.directory, 'index.sqlite'))
+            db.execute('PRAGMA foreign_keys = ON')
+            self._local.connection = (os.getpid(), db)
+        db.execute('PRAGMA busy_timeout = %d' % (timeout * 1000))
+        with db:
+            yield db
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    @staticmethod
+    def key(datasets, geobox, measurement, fuse_func=None, order_by_overlap=False):
+        """
+        Key of the result of fusing `datasets` into `geobox` for `measurement`, or None if it can't be cached.
+
+        :rtype: str or None
+        """
+        fuser = _fuser_name(fuse_func)
+        if fuser is None:
+            return None
+
+        description = {
+            'datasets': sorted(_dataset_version(dataset) for dataset in datasets),
+            'crs': str(geobox.crs),
+            'affine': list(geobox.affine)[:6],
+            'shape': list(geobox.shape),
+            'measurement': measurement['name'],
+            'dtype': str(numpy.dtype(measurement['dtype'])),
+            'nodata': str(measurement['nodata']),
+            'resampling': measurement.get('resampling_method', 'nearest'),
+            'fuser': fuser,
+            'order_by_overlap': bool(order_by_overlap),
+        }
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key, dest):
+        """
+        Copy the cached array for `key` into `dest`.
+
+        :return: whether the entry was found
+        """
+        with self._connect() as db:
+            found = db.execute('SELECT last_used FROM entry WHERE key = ?', (key,)).fetchone()
+
+        data = None
+        if found:
+            if time.time() - found[0] > _TOUCH_INTERVAL:
+                self._touch(key)
+            try:
+                data = numpy.load(self._filename(key))
+            except (IOError, OSError, ValueError) as e:
+                _LOG.warning('Dropping unreadable result cache entry %s: %s', key, e)
+                self._remove([key])
+
+        with self._stats_lock:
+            if data is None or data.shape != dest.shape:
+                self.misses += 1
+                return False
+            self.hits += 1
+
+        numpy.copyto(dest, data, casting='unsafe')
+        return True
+
+    def _touch(self, key):
+        """Update the last use time of `key`, unless another connection is writing to the database"""
+        try:
+            with self._connect(timeout=0) as db:
+                db.execute('UPDATE entry SET last_used = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.OperationalError as e:
+            # Only affects which entries are evicted first, not worth waiting for
+            _LOG.debug('Skipped updating the last use of result cache entry %s: %s', key, e)
+
+    def put(self, key, data, datasets):
+        """
+        Store `data` under `key`, recording the `datasets` it was built from.
+        """
+        filename = self._filename(key)
+        temp_filename = '{}.{}.{}.tmp'.format(filename, os.getpid(), threading.get_ident())
+        with open(temp_filename, 'wb') as f:
+            numpy.save(f, data)
+        os.replace(temp_filename, filename)
+
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO entry (key, size, last_used) VALUES (?, ?, ?)',
+                       (key, os.path.getsize(filename), time.time()))
+            db.execute('DELETE FROM entry_dataset WHERE key = ?', (key,))
+            db.executemany('INSERT INTO entry_dataset (key, dataset_id) VALUES (?, ?)',
+                           [(key, str(dataset.id)) for dataset in datasets])
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until the cache fits in `max_bytes`"""
+        with self._connect() as db:
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entry').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in db.execute('SELECT key, size FROM entry ORDER BY last_used'):
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+        self._remove(evicted)
+
+    def _remove(self, keys):
+        with self._connect() as db:
+            db.executemany('DELETE FROM entry WHERE key = ?', [(key,) for key in keys])
+        for key in keys:
+            try:
+                os.remove(self._filename(key))
+            except OSError:
+                pass
+
+    def invalidate(self, dataset_ids):
+        """
+        Remove all the entries built from any of `dataset_ids`.
+
+        :param dataset_ids: iterable of dataset ids (UUID or str)
+        """
+        dataset_ids = [str(id_) for id_ in dataset_ids]
+        keys = set()
+        with self._connect() as db:
+            # Stay well within the limit on the number of parameters of a query
+            for start in range(0, len(dataset_ids), 500):
+                batch = dataset_ids[start:start + 500]
+                query = 'SELECT key FROM entry_dataset WHERE dataset_id IN ({})'.format(','.join('?' * len(batch)))
+                keys.update(key for key, in db.execute(query, batch))
+        if keys:
+            _LOG.debug('Invalidating %s result cache entries', len(keys))
+            self._remove(list(keys))
+
+    def clear(self):
+        """Remove all entries, and reset the hit/miss statistics"""
+        with self._connect() as db:
+            keys = [key for key, in db.execute('SELECT key FROM entry')]
+        self._remove(keys)
+        with self._stats_lock:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        :rtype: CacheInfo
+        """
+        with self._connect() as db:
+            entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entry').fetchone()
+        return CacheInfo(hits=self.hits, misses=self.misses, entries=entries, size=size, maxsize=self.max_bytes)
+
+
+def _dataset_version(dataset):
+    """Id of `dataset` with a hash of its locations and document, which change when it is updated"""
+    content = json.dumps([dataset.uris, dataset.metadata_doc], sort_keys=True, default=str)
+    return '{}:{}'.format(dataset.id, hashlib.sha1(content.encode('utf-8')).hexdigest())
+
+
+def _code_hash(code):
+    """Hash of the bytecode, names and constants of `code`, including the functions defined in it"""
+    digest = hashlib.sha1(code.co_code)
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            const = _code_hash(const)
+        elif isinstance(const, frozenset):
+            # Iteration order of sets of strings changes from one process to the next
+            const = sorted(const, key=repr)
+        digest.update(repr(const).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _fuser_name(fuse_func):
+    """
+    Stable name of `fuse_func`, or None if it doesn't have one (eg. a lambda or a closure).
+
+    Names of python functions include a hash of their code, so that results aren't reused after they are edited.
+    """
+    if fuse_func is None:
+        return 'copy'
+    if isinstance(fuse_func, string_types):
+        return fuse_func
+    if isinstance(fuse_func, StackedFuser):
+        return repr(fuse_func)
+    name = getattr(fuse_func, '__qualname__', None)
+    if name is None or '<' in name:
+        return None
+    name = '{}.{}'.format(fuse_func.__module__, name)
+    code = getattr(fuse_func, '__code__', None)
+    return '{}:{}'.format(name, _code_hash(code)) if code is not None else name
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_result_cache():
+    """
+    The result cache configured by the `result_cache_dir` and `result_cache_max_bytes` options, or None if disabled.
+
+    :rtype: ResultCache or None
+    """
+    directory = OPTIONS['result_cache_dir']
+    if not directory:
+        return None
+
+    with _CACHES_LOCK:
+        cache = _CACHES.get(directory)
+        if cache is None:
+            cache = _CACHES[directory] = ResultCache(directory, OPTIONS['result_cache_max_bytes'])
+        cache.max_bytes = OPTIONS['result_cache_max_bytes']
+        return cache
+
+
+def result_cache_info():
+    """
+    Statistics of the configured result cache, or None if it is disabled.
+
+    :rtype: CacheInfo or None
+    """
+    cache = get_result_cache()
+    return cache.info() if cache is not None else None
+
+
+def invalidate_datasets(dataset_ids):
+    """
+    Drop the entries of the configured result cache built from any of `dataset_ids`, if the cache is enabled.
+    """
+    cache = get_result_cache()
+    if cache is not None:
+        cache.invalidate(dataset_ids)
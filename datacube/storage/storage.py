@@ -5,24 +5,35 @@ Create/store dataset data into storage units based on the provided storage mappi
 Important functions are:
 
 * :func:`reproject_and_fuse`
+* :func:`reproject_and_fuse_bands`
 * :func:`read_from_source`
 
 """
 from __future__ import absolute_import, division, print_function
 
+import functools
 import logging
 import math
-from contextlib import contextmanager
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
 from pathlib import Path
 
+import cachetools
+
 from datacube.compat import urlparse, urljoin, url_parse_module
 from datacube.config import OPTIONS
 from datacube.drivers.datasource import DataSource
 from datacube.model import Dataset
 from datacube.storage import netcdf_writer
+from datacube.storage._handles import HandleCache, CacheInfo
+from datacube.storage.fusers import StackedFuser, get_fuser, _extreme_value
 from datacube.utils import clamp, datetime_to_seconds_since_1970, DatacubeException, ignore_exceptions_if
 from datacube.utils import geometry
 from datacube.utils import is_url, uri_to_local_path
+from datacube.utils.stats import bind_stats, timed
 
 try:
     from yaml import CSafeDumper as SafeDumper
@@ -31,7 +42,7 @@ except ImportError:
 import numpy
 
 from affine import Affine
-from datacube.compat import integer_types
+from datacube.compat import integer_types, string_types
 import rasterio
 
 try:
@@ -49,6 +60,10 @@ RESAMPLING_METHODS = {
     'lanczos': Resampling.lanczos,
     'average': Resampling.average,
 }
+# Only available with rasterio 1.0 onwards
+for _name in ('mode', 'min', 'max'):
+    if hasattr(Resampling, _name):
+        RESAMPLING_METHODS[_name] = getattr(Resampling, _name)
 
 assert str(rasterio.__version__) >= '0.34.0', "rasterio version 0.34.0 or higher is required"
 GDAL_NETCDF_DIM = ('NETCDF_DIM_'
@@ -127,6 +142,113 @@ def _read_decimated(array_transform, src, dest_shape):
     return None, None, None
 
 
+#: Number of extra source pixels needed on each side of a window by the resampling kernels
+_RESAMPLING_MARGIN = {
+    Resampling.nearest: 1,
+    Resampling.bilinear: 2,
+    Resampling.average: 2,
+    Resampling.cubic: 3,
+    Resampling.cubic_spline: 3,
+    Resampling.lanczos: 4,
+}
+
+
+def _source_window(src, dst_shape, dst_transform, dst_crs, resampling):
+    """
+    Compute the window of `src` needed to fill a destination grid, padded to leave room for the resampling kernel.
+
+    :param src: band source with `crs`, `transform` and `shape` properties
+    :param (int,int) dst_shape: destination shape
+    :param affine.Affine dst_transform: destination transform
+    :param dst_crs: destination CRS
+    :return: ((row_start, row_stop), (col_start, col_stop)) window in `src`, or None if the destination
+             doesn't overlap `src` at all
+    """
+    height, width = dst_shape
+    full_window = ((0, src.shape[0]), (0, src.shape[1]))
+
+    footprint = geometry.polygon_from_transform(width, height, dst_transform, geometry.CRS(str(dst_crs)))
+    # Densify the edges so that curved edges are covered in the source CRS
+    resolution = max(abs(dst_transform.a) * width, abs(dst_transform.e) * height) / 16
+    bbox = footprint.to_crs(src.crs, resolution=resolution).boundingbox
+
+    inverse = ~src.transform
+    corners = [inverse * (x, y) for x in (bbox.left, bbox.right) for y in (bbox.bottom, bbox.top)]
+    cols, rows = zip(*corners)
+    if not all(math.isfinite(v) for v in cols + rows):
+        return full_window
+
+    margin = _RESAMPLING_MARGIN.get(resampling, max(_RESAMPLING_MARGIN.values()))
+    row_start = max(0, int(math.floor(min(rows))) - margin)
+    row_stop = min(src.shape[0], int(math.ceil(max(rows))) + margin)
+    col_start = max(0, int(math.floor(min(cols))) - margin)
+    col_stop = min(src.shape[1], int(math.ceil(max(cols))) + margin)
+
+    if row_start >= row_stop or col_start >= col_stop:
+        return None
+    return (row_start, row_stop), (col_start, col_stop)
+
+
+def _usable_overviews(src, resampling):
+    """
+    Decimation factors of the overviews of `src` that may be used with `resampling`.
+
+    :param src: band source, wrapping a :class:`rasterio.Band`
+    :rtype: list[int]
+    """
+    if resampling not in [_rasterio_resampling_method(method) for method in OPTIONS['overview_resampling']]:
+        return []
+    try:
+        return src.source.ds.overviews(src.source.bidx)
+    except AttributeError:
+        # Not backed by a rasterio dataset, eg. S3
+        return []
+
+
+def _overview_factor(overviews, window, dst_shape):
+    """
+    Largest overview factor that is still at least as fine as the destination resolution, or 1.
+    """
+    (row_start, row_stop), (col_start, col_stop) = window
+    scale = min((row_stop - row_start) / dst_shape[0], (col_stop - col_start) / dst_shape[1])
+    return max([1] + [factor for factor in overviews if factor <= scale + 1e-5])
+
+
+def _reproject_window(src, dest, dst_transform, dst_crs, dst_nodata, resampling, overviews=(), **kwargs):
+    """
+    Reproject only the part of `src` needed to fill `dest`, reading it from an overview if possible.
+    """
+    window = _source_window(src, dest.shape, dst_transform, dst_crs, resampling)
+    if window is None:
+        # Nothing to read
+        dest.fill(dst_nodata)
+        return dest
+
+    (row_start, row_stop), (col_start, col_stop) = window
+    src_transform = src.transform * Affine.translation(col_start, row_start)
+
+    factor = _overview_factor(overviews, window, dest.shape)
+    if factor > 1:
+        height, width = row_stop - row_start, col_stop - col_start
+        out_shape = (int(math.ceil(height / factor)), int(math.ceil(width / factor)))
+        # GDAL serves reads with a reduced out_shape from the matching overview
+        source = src.read(window=window, out_shape=out_shape)
+        src_transform *= Affine.scale(width / out_shape[1], height / out_shape[0])
+    else:
+        source = src.read(window=window)
+
+    return rasterio.warp.reproject(source,
+                                   dest,
+                                   src_transform=src_transform,
+                                   src_crs=str(src.crs),
+                                   src_nodata=src.nodata,
+                                   dst_transform=dst_transform,
+                                   dst_crs=str(dst_crs),
+                                   dst_nodata=dst_nodata,
+                                   resampling=resampling,
+                                   **kwargs)
+
+
 def _no_scale(affine, eps=1e-5):
     return abs(abs(affine.a) - 1.0) < eps and abs(abs(affine.e) - 1.0) < eps
 
@@ -135,6 +257,232 @@ def _no_fractional_translate(affine, eps=0.01):
     return abs(affine.c % 1.0) < eps and abs(affine.f % 1.0) < eps
 
 
+def _is_pixel_aligned(affine, eps=1e-5):
+    """Whether `affine` is a translation by a whole number of pixels"""
+    return (abs(affine.a - 1.0) < eps and abs(affine.e - 1.0) < eps and abs(affine.b) < eps and abs(affine.d) < eps
+            and abs(affine.c - round(affine.c)) < eps and abs(affine.f - round(affine.f)) < eps)
+
+
+def _read_aligned(array_transform, src, dest, dst_nodata):
+    """
+    Read from `src` into `dest`, when `array_transform` (from `dest` to `src` pixels) is a whole pixel translation.
+
+    The overlapping window is read straight into `dest`, and only the rest of `dest` is filled with `dst_nodata`.
+    """
+    row_offset, col_offset = int(round(array_transform.f)), int(round(array_transform.c))
+    row_start, row_stop = max(0, -row_offset), min(dest.shape[0], src.shape[0] - row_offset)
+    col_start, col_stop = max(0, -col_offset), min(dest.shape[1], src.shape[1] - col_offset)
+    if row_start >= row_stop or col_start >= col_stop:
+        dest.fill(dst_nodata)
+        return
+
+    dest[:row_start].fill(dst_nodata)
+    dest[row_stop:].fill(dst_nodata)
+    dest[row_start:row_stop, :col_start].fill(dst_nodata)
+    dest[row_start:row_stop, col_stop:].fill(dst_nodata)
+
+    overlap = dest[row_start:row_stop, col_start:col_stop]
+    window = ((row_start + row_offset, row_stop + row_offset), (col_start + col_offset, col_stop + col_offset))
+    with timed('read', overlap.nbytes):
+        _read_into(src, window, overlap)
+        if not (numpy.isnan(src.nodata) and numpy.isnan(dst_nodata)) and src.nodata != dst_nodata:
+            overlap[_nodata_mask(overlap, src.nodata)] = dst_nodata
+
+
+def _read_into(src, window, out):
+    """Read `window` of the band source `src` into `out`, with no intermediate array when reading with rasterio"""
+    band = getattr(src, 'source', None)
+    if isinstance(band, rasterio.Band) and out.dtype == src.dtype:
+        band.ds.read(indexes=band.bidx, window=window, out=out)
+    else:
+        numpy.copyto(out, src.read(window=window))
+
+
+def _integer_ratio(scale, offset, eps=1e-6):
+    """
+    Along one axis, how source and destination pixels nest into each other.
+
+    :param scale: source pixels per destination pixel
+    :param offset: source pixel of the edge of the first destination pixel
+    :return: ``(factor, upsampling)``, or None if the pixel edges don't line up
+    """
+    if scale > 1 - eps:
+        factor = int(round(scale))
+        if abs(scale - factor) < eps * factor and abs(offset - round(offset)) < eps:
+            return factor, False
+    elif scale > eps:
+        factor = int(round(1 / scale))
+        if abs(scale * factor - 1) < eps and abs(offset * factor - round(offset * factor)) < eps * factor:
+            return factor, True
+    return None
+
+
+def _integer_ratios(array_transform):
+    """Row and column :func:`_integer_ratio` of `array_transform`, or None if pixels don't nest in both"""
+    if abs(array_transform.b) > 1e-6 or abs(array_transform.d) > 1e-6:
+        return None
+    ratios = (_integer_ratio(array_transform.e, array_transform.f),
+              _integer_ratio(array_transform.a, array_transform.c))
+    return None if None in ratios else ratios
+
+
+def _block_axis(factor, upsampling, offset, src_size, dst_size):
+    """
+    Plan the read of one axis for :func:`_read_integer_ratio`.
+
+    :return: ``(dst_start, dst_stop, src_start, src_stop, skip)``: the destination pixels touching the source, the
+             source pixels to read for them (possibly past the edges, when downsampling), and the number of
+             leading upsampled pixels to drop
+    """
+    if upsampling:
+        offset = int(round(offset * factor))
+        dst_start, dst_stop = max(0, -offset), min(dst_size, src_size * factor - offset)
+        src_start, src_stop = (offset + dst_start) // factor, (offset + dst_stop - 1) // factor + 1
+        return dst_start, dst_stop, src_start, src_stop, offset + dst_start - src_start * factor
+
+    offset = int(round(offset))
+    dst_start, dst_stop = max(0, -offset // factor), min(dst_size, -((offset - src_size) // factor))
+    return dst_start, dst_stop, offset + dst_start * factor, offset + dst_stop * factor, 0
+
+
+def _block_slices(array, row_factor, col_factor):
+    """Views of `array` holding every pixel at the same position within its block, one per position"""
+    for row in range(row_factor):
+        for col in range(col_factor):
+            yield array[row::row_factor, col::col_factor]
+
+
+def _block_average(data, valid, row_factor, col_factor):
+    shape = (data.shape[0] // row_factor, data.shape[1] // col_factor)
+    total = numpy.zeros(shape, dtype='float64')
+    count = numpy.zeros(shape, dtype='int32')
+    for values, mask in zip(_block_slices(data, row_factor, col_factor), _block_slices(valid, row_factor, col_factor)):
+        numpy.add(total, values, out=total, where=mask)
+        count += mask
+    mean = total / numpy.maximum(count, 1)
+    if data.dtype.kind != 'f':
+        # Round half up, like GDAL
+        mean = numpy.floor(mean + 0.5)
+    return mean, count > 0
+
+
+def _block_extreme(data, valid, row_factor, col_factor, largest):
+    shape = (data.shape[0] // row_factor, data.shape[1] // col_factor)
+    result = numpy.full(shape, _extreme_value(data.dtype, largest=not largest), dtype=data.dtype)
+    has_data = numpy.zeros(shape, dtype=bool)
+    pick = numpy.maximum if largest else numpy.minimum
+    for values, mask in zip(_block_slices(data, row_factor, col_factor), _block_slices(valid, row_factor, col_factor)):
+        pick(result, values, out=result, where=mask)
+        has_data |= mask
+    return result, has_data
+
+
+def _block_min(data, valid, row_factor, col_factor):
+    return _block_extreme(data, valid, row_factor, col_factor, largest=False)
+
+
+def _block_max(data, valid, row_factor, col_factor):
+    return _block_extreme(data, valid, row_factor, col_factor, largest=True)
+
+
+def _block_mode(data, valid, row_factor, col_factor):
+    height, width, size = data.shape[0] // row_factor, data.shape[1] // col_factor, row_factor * col_factor
+    blocks = data.reshape((height, row_factor, width, col_factor)).swapaxes(1, 2).reshape((height, width, size))
+    valid = valid.reshape((height, row_factor, width, col_factor)).swapaxes(1, 2).reshape((height, width, size))
+
+    rows, cols = numpy.ogrid[:height, :width]
+    rows, cols = rows[..., numpy.newaxis], cols[..., numpy.newaxis]
+    # A stable sort keeps equal values in the order they are in the block
+    order = numpy.argsort(blocks, axis=-1, kind='mergesort')
+    values = blocks[rows, cols, order]
+
+    # Number of times the value of every sorted element was seen up to it
+    index = numpy.arange(size)
+    run_start = numpy.ones(values.shape, dtype=bool)
+    run_start[..., 1:] = values[..., 1:] != values[..., :-1]
+    run_length = index - numpy.maximum.accumulate(numpy.where(run_start, index, 0), axis=-1) + 1
+    run_length[~valid[rows, cols, order]] = 0
+
+    # Ties go to the value reaching the count first when going through the block, like GDAL
+    best = (run_length * size - order).argmax(axis=-1)
+    return values[rows[..., 0], cols[..., 0], best], valid.any(axis=-1)
+
+
+#: Reductions of blocks of ``row_factor * col_factor`` pixels, into ``(result, has_data)``, by resampling method
+_BLOCK_REDUCERS = {
+    Resampling.average: _block_average,
+}
+for _name, _reducer in (('mode', _block_mode), ('min', _block_min), ('max', _block_max)):
+    if _name in RESAMPLING_METHODS:
+        _BLOCK_REDUCERS[RESAMPLING_METHODS[_name]] = _reducer
+
+
+def _read_integer_ratio(ratios, array_transform, src, dest, dst_nodata, resampling):
+    """
+    Read from `src` into `dest` when their pixels nest into each other, with numpy instead of a GDAL warp.
+
+    Upsampling replicates source pixels. Downsampling reduces blocks of source pixels, skipping nodata: taking
+    the centre pixel for nearest neighbour, or the mean, mode, min or max of the valid pixels.
+
+    :param ratios: ``(factor, upsampling)`` for the rows and the columns, see :func:`_integer_ratio`
+    """
+    dest.fill(dst_nodata)
+    (row_factor, row_up), (col_factor, col_up) = ratios
+    row_plan = _block_axis(row_factor, row_up, array_transform.f, src.shape[0], dest.shape[0])
+    col_plan = _block_axis(col_factor, col_up, array_transform.c, src.shape[1], dest.shape[1])
+    (dst_row_start, dst_row_stop, row_start, row_stop, row_skip) = row_plan
+    (dst_col_start, dst_col_stop, col_start, col_stop, col_skip) = col_plan
+    if dst_row_start >= dst_row_stop or dst_col_start >= dst_col_stop:
+        return
+
+    with timed('read') as timer:
+        # Pad with nodata where the blocks go past the edges of the source
+        data = numpy.full((row_stop - row_start, col_stop - col_start), src.nodata, dtype=src.dtype)
+        read_rows = max(row_start, 0), min(row_stop, src.shape[0])
+        read_cols = max(col_start, 0), min(col_stop, src.shape[1])
+        _read_into(src, (read_rows, read_cols),
+                   data[read_rows[0] - row_start:read_rows[1] - row_start,
+                        read_cols[0] - col_start:read_cols[1] - col_start])
+        timer.nbytes = data.nbytes
+
+    with timed('resample', dest.nbytes):
+        height, width = dst_row_stop - dst_row_start, dst_col_stop - dst_col_start
+        if row_up:
+            data = data.repeat(row_factor, axis=0)[row_skip:row_skip + height]
+            row_factor = 1
+        if col_up:
+            data = data.repeat(col_factor, axis=1)[:, col_skip:col_skip + width]
+            col_factor = 1
+
+        if resampling == Resampling.nearest or row_factor == col_factor == 1:
+            result = data[row_factor // 2::row_factor, col_factor // 2::col_factor]
+            has_data = ~_nodata_mask(result, src.nodata)
+        else:
+            reducer = _BLOCK_REDUCERS[resampling]
+            result, has_data = reducer(data, ~_nodata_mask(data, src.nodata), row_factor, col_factor)
+
+        numpy.copyto(dest[dst_row_start:dst_row_stop, dst_col_start:dst_col_stop], result,
+                     where=has_data, casting='unsafe')
+
+
+def _has_dtype(src):
+    """Whether the data type of `src` is known, which :func:`_read_integer_ratio` needs and S3 sources don't have"""
+    return getattr(src, 'dtype', None) is not None
+
+
+def _has_overview_for(ratios, src, resampling):
+    """
+    Whether downsampling by `ratios` can read an overview of `src` rather than reducing full resolution blocks.
+
+    :param ratios: ``(factor, upsampling)`` for the rows and the columns, see :func:`_integer_ratio`
+    """
+    (row_factor, row_up), (col_factor, col_up) = ratios
+    if row_up or col_up:
+        return False
+    scale = min(row_factor, col_factor)
+    return any(1 < factor <= scale for factor in _usable_overviews(src, resampling))
+
+
 def read_from_source(source, dest, dst_transform, dst_nodata, dst_projection, resampling):
     """
     Read from `source` into `dest`, reprojecting if necessary.
@@ -143,20 +491,49 @@ def read_from_source(source, dest, dst_transform, dst_nodata, dst_projection, re
     :param numpy.ndarray dest: Data destination
     """
     with source.open() as src:
-        array_transform = ~src.transform * dst_transform
-        # if the CRS is the same use decimated reads if possible (NN or 1:1 scaling)
-        if src.crs == dst_projection and _no_scale(array_transform) and (resampling == Resampling.nearest or
-                                                                         _no_fractional_translate(array_transform)):
-            dest.fill(dst_nodata)
+        _read_band(src, dest, dst_transform, dst_nodata, dst_projection, resampling)
+
+
+def _read_band(src, dest, dst_transform, dst_nodata, dst_projection, resampling):
+    """
+    Read from an already opened band source `src` into `dest`, reprojecting if necessary.
+
+    Every pixel of `dest` is written, with `dst_nodata` where `src` has no data.
+
+    :param BandDataSource src: Opened band source, as returned by :meth:`RasterioDataSource.open`
+    :param numpy.ndarray dest: Data destination
+    """
+    array_transform = ~src.transform * dst_transform
+    same_crs = src.crs == dst_projection
+    ratios = _integer_ratios(array_transform) if same_crs else None
+    if same_crs and _is_pixel_aligned(array_transform):
+        # Same pixel grid, eg. ingested data loaded on its GridSpec: plain windowed read
+        _read_aligned(array_transform, src, dest, dst_nodata)
+    elif ratios is not None and (resampling == Resampling.nearest or resampling in _BLOCK_REDUCERS) and \
+            _has_dtype(src) and not _has_overview_for(ratios, src, resampling):
+        # Eg. 20m data on a 10m grid, or 25m data on a 100m grid, without an overview to read instead
+        _read_integer_ratio(ratios, array_transform, src, dest, dst_nodata, resampling)
+    # if the CRS is the same use decimated reads if possible (NN or 1:1 scaling)
+    elif same_crs and _no_scale(array_transform) and (resampling == Resampling.nearest or
+                                                      _no_fractional_translate(array_transform)):
+        dest.fill(dst_nodata)
+        with timed('read') as timer:
             tmp, offset, _ = _read_decimated(array_transform, src, dest.shape)
             if tmp is None:
                 return
+            timer.nbytes = tmp.nbytes
             dest = dest[offset[0]:offset[0] + tmp.shape[0], offset[1]:offset[1] + tmp.shape[1]]
             numpy.copyto(dest, tmp, where=(tmp != src.nodata))
-        else:
-            if dest.dtype == numpy.dtype('int8'):
-                dest = dest.view(dtype='uint8')
-                dst_nodata = dst_nodata.astype('uint8')
+    elif resampling == Resampling.nearest and OPTIONS['warp_plan_cache_bytes'] > 0 and \
+            not _usable_overviews(src, resampling):
+        _read_with_warp_plan(src, dest, dst_transform, dst_nodata, dst_projection)
+    else:
+        if dest.dtype == numpy.dtype('int8'):
+            dest = dest.view(dtype='uint8')
+            dst_nodata = dst_nodata.astype('uint8')
+        # Older rasterio releases leave pixels outside the source untouched
+        dest.fill(dst_nodata)
+        with timed('reproject', dest.nbytes):
             src.reproject(dest,
                           dst_transform=dst_transform,
                           dst_crs=str(dst_projection),
@@ -165,6 +542,134 @@ def read_from_source(source, dest, dst_transform, dst_nodata, dst_projection, re
                           NUM_THREADS=OPTIONS['reproject_threads'])
 
 
+class _WarpPlan(object):
+    """
+    Source pixel of every destination pixel of a nearest neighbour reprojection between two grids.
+
+    :ivar window: window of the source read, or None if the destination doesn't overlap the source
+    :ivar numpy.ndarray index: index into the flattened window of every destination pixel
+    :ivar numpy.ndarray inside: mask of the destination pixels within the source
+    """
+    __slots__ = ('window', 'index', 'inside')
+
+    def __init__(self, window, index=None, inside=None):
+        self.window = window
+        self.index = index
+        self.inside = inside
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.inside.nbytes if self.window is not None else 0
+
+
+def _make_warp_plan(src, dst_shape, dst_transform, dst_crs):
+    """
+    Compute the :class:`_WarpPlan` of reading `src` into a destination grid.
+
+    Warps the index of every source pixel with GDAL, so that the plan matches GDAL's nearest neighbour exactly.
+    """
+    window = _source_window(src, dst_shape, dst_transform, dst_crs, Resampling.nearest)
+    if window is None:
+        return _WarpPlan(None)
+
+    (row_start, row_stop), (col_start, col_stop) = window
+    source_index = numpy.arange((row_stop - row_start) * (col_stop - col_start), dtype='int32')
+    index = numpy.full(dst_shape, -1, dtype='int32')
+    rasterio.warp.reproject(source_index.reshape((row_stop - row_start, col_stop - col_start)),
+                            index,
+                            src_transform=src.transform * Affine.translation(col_start, row_start),
+                            src_crs=str(src.crs),
+                            src_nodata=-1,
+                            dst_transform=dst_transform,
+                            dst_crs=str(dst_crs),
+                            dst_nodata=-1,
+                            resampling=Resampling.nearest,
+                            NUM_THREADS=OPTIONS['reproject_threads'])
+    inside = index >= 0
+    index[~inside] = 0
+    return _WarpPlan(window, index, inside)
+
+
+class _WarpPlanCache(object):
+    """Least recently used :class:`_WarpPlan` objects, holding up to `warp_plan_cache_bytes` of them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plans = cachetools.LRUCache(maxsize=0, getsizeof=lambda plan: plan.nbytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, src, dst_shape, dst_transform, dst_crs):
+        maxsize = OPTIONS['warp_plan_cache_bytes']
+        key = (str(src.crs), tuple(src.transform)[:6], tuple(src.shape),
+               str(dst_crs), tuple(dst_transform)[:6], tuple(dst_shape), Resampling.nearest)
+        with self._lock:
+            if self._plans.maxsize != maxsize:
+                self._plans = cachetools.LRUCache(maxsize=maxsize, getsizeof=lambda plan: plan.nbytes)
+            plan = self._plans.get(key)
+            if plan is not None:
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        plan = _make_warp_plan(src, dst_shape, dst_transform, dst_crs)
+        with self._lock:
+            if plan.nbytes <= self._plans.maxsize:
+                self._plans[key] = plan
+        return plan
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses, size=self._plans.currsize,
+                             maxsize=self._plans.maxsize)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_WARP_PLAN_CACHE = _WarpPlanCache()
+
+
+def _read_with_warp_plan(src, dest, dst_transform, dst_nodata, dst_projection):
+    """
+    Nearest neighbour reprojection of `src` into `dest` with a cached :class:`_WarpPlan`.
+    """
+    plan = _WARP_PLAN_CACHE.get(src, dest.shape, dst_transform, dst_projection)
+    dest.fill(dst_nodata)
+    if plan.window is None:
+        return
+
+    with timed('read') as timer:
+        data = src.read(window=plan.window)
+        timer.nbytes = data.nbytes
+    with timed('reproject', dest.nbytes):
+        values = data.ravel().take(plan.index)
+        numpy.copyto(dest, values, where=plan.inside & ~_nodata_mask(values, src.nodata), casting='unsafe')
+
+
+def warp_plan_cache_info():
+    """
+    Statistics of the process-wide cache of warp plans.
+
+    The cache is enabled by setting the ``warp_plan_cache_bytes`` option, eg::
+
+        datacube.set_options(warp_plan_cache_bytes=2 * 1024 ** 3)
+
+    :return: named tuple with the number of cache hits and misses, the size of the cached plans in bytes,
+             and the maximum size of the cache
+    :rtype: datacube.storage._handles.CacheInfo
+    """
+    return _WARP_PLAN_CACHE.info()
+
+
+def clear_warp_plan_cache():
+    """Drop all cached warp plans and reset the cache statistics."""
+    _WARP_PLAN_CACHE.clear()
+
+
 def reproject_and_fuse(datasources, destination, dst_transform, dst_projection, dst_nodata,
                        resampling='nearest', fuse_func=None, skip_broken_datasets=False):
     """
@@ -178,33 +683,422 @@ def reproject_and_fuse(datasources, destination, dst_transform, dst_projection,
     """
     assert len(destination.shape) == 2
 
-    resampling = _rasterio_resampling_method(resampling)
+    reproject_and_fuse_bands([[source] for source in datasources], [destination], dst_transform, dst_projection,
+                             [dst_nodata], resampling=resampling, fuse_func=fuse_func,
+                             skip_broken_datasets=skip_broken_datasets)
+    return destination
+
+
+def reproject_and_fuse_bands(datasources, destinations, dst_transform, dst_projection, dst_nodata,
+                             resampling='nearest', fuse_func=None, skip_broken_datasets=False):
+    """
+    Reproject and fuse several bands of the same sources into 2D numpy arrays `destinations`.
+
+    Data sources of one dataset that read from the same file share a single open file handle, so a
+    multi-band file is opened once no matter how many of its bands are requested.
+
+    With the default fuser (`fuse_func` is None), fusing stops as soon as the destinations hold no
+    more nodata pixels: later sources are neither opened nor read.
+
+    A :class:`datacube.storage.fusers.StackedFuser` gets the data of all the sources of a band at once.
+    `fuse_func` may also be the name of a fuser in :data:`datacube.storage.fusers.FUSERS`.
+
+    When the `concurrent_reads` option is set (see :class:`datacube.set_options`), up to that many sources
+    are read at the same time, before being fused in order. This helps with remote (eg. HTTP or S3) files,
+    where reading is mostly waiting on the network, at the cost of holding the data of every source in memory.
+
+    :param List[List[DataSource]] datasources: For every dataset in fusing order, a list holding one
+                                               data source per destination band
+    :param List[numpy.ndarray] destinations: 2D ndarrays of appropriate size to read data into, one per band
+    :param list dst_nodata: nodata value of every destination band
+    :param resampling: resampling method name, or a list holding one per band
+    :type fuse_func: callable, str, StackedFuser or None
+    :param bool skip_broken_datasets: Carry on in the face of adversity and failing reads.
+    :return: `destinations`
+    """
+    assert all(len(destination.shape) == 2 for destination in destinations)
+
+    if isinstance(resampling, string_types):
+        resampling = [resampling] * len(destinations)
+    resampling = [_rasterio_resampling_method(method) for method in resampling]
 
+    fuse_func = get_fuser(fuse_func)
+    if OPTIONS['concurrent_reads'] > 1 and len(datasources) > 1:
+        return _reproject_and_fuse_concurrently(datasources, destinations, dst_transform, dst_projection, dst_nodata,
+                                                resampling, fuse_func, skip_broken_datasets,
+                                                OPTIONS['concurrent_reads'])
+
+    if isinstance(fuse_func, StackedFuser):
+        return _reproject_and_fuse_stacked(datasources, destinations, dst_transform, dst_projection, dst_nodata,
+                                           resampling, fuse_func, skip_broken_datasets)
+
+    if len(datasources) == 1:
+        return _read_single_source(datasources[0], destinations, dst_transform, dst_projection, dst_nodata,
+                                   resampling, skip_broken_datasets)
+
+    fuse_funcs = [fuse_func or _copyto_fuser(nodata) for nodata in dst_nodata]
+
+    for destination, nodata in zip(destinations, dst_nodata):
+        destination.fill(nodata)
+
+    if len(datasources) == 0:
+        return destinations
+
+    # Multiple sources, each is read into a scratch buffer then fused into the destination
+    buffers = [_scratch_buffer(destination.shape, destination.dtype, band)
+               for band, destination in enumerate(destinations)]
+
+    # The default fuser only ever fills in nodata pixels, so once a band has no nodata left
+    # the remaining sources can't change it, and are not read at all.
+    stop_when_complete = fuse_func is None
+    incomplete = [True] * len(destinations)
+
+    band_params = list(zip(buffers, destinations, dst_nodata, resampling, fuse_funcs))
+    for band_sources in datasources:
+        if not any(incomplete):
+            break
+
+        band_sources = [source if todo else None for source, todo in zip(band_sources, incomplete)]
+        with ignore_exceptions_if(skip_broken_datasets), _open_bands(band_sources) as bands:
+            for index, (src, (buffer_, destination, nodata, method, fuse)) in enumerate(zip(bands, band_params)):
+                if src is None:
+                    continue
+                with ignore_exceptions_if(skip_broken_datasets):
+                    _read_band(src, buffer_, dst_transform, nodata, dst_projection, method)
+                    with timed('fuse', buffer_.nbytes):
+                        fuse(destination, buffer_)
+                    if stop_when_complete:
+                        incomplete[index] = _nodata_mask(destination, nodata).any()
+
+    return destinations
+
+
+def _read_single_source(band_sources, destinations, dst_transform, dst_projection, dst_nodata, resampling,
+                        skip_broken_datasets):
+    """
+    Read the bands of a single dataset straight into `destinations`.
+
+    :func:`_read_band` writes every pixel of its destination, so only bands which failed to read are filled
+    with nodata.
+    """
+    read = [False] * len(destinations)
+    with ignore_exceptions_if(skip_broken_datasets), _open_bands(band_sources) as bands:
+        for index, (src, destination, nodata, method) in enumerate(zip(bands, destinations, dst_nodata, resampling)):
+            with ignore_exceptions_if(skip_broken_datasets):
+                _read_band(src, destination, dst_transform, nodata, dst_projection, method)
+                read[index] = True
+
+    for destination, nodata, was_read in zip(destinations, dst_nodata, read):
+        if not was_read:
+            destination.fill(nodata)
+    return destinations
+
+
+#: The :class:`_ScratchBuffers` in use by each thread, as a `buffers` attribute
+_SCRATCH = threading.local()
+
+
+class _ScratchBuffers(object):
+    """
+    Scratch buffers kept for reuse by the threads of a load, see :func:`scratch_buffers`.
+    """
+
+    def __init__(self):
+        #: thread id -> OrderedDict of buffers, least recently used first
+        self._by_thread = {}
+
+    def get(self, shape, dtype, slot, max_bytes):
+        buffers = self._by_thread.setdefault(threading.get_ident(), OrderedDict())
+        key = (tuple(shape), numpy.dtype(dtype).str, slot)
+        buffer_ = buffers.pop(key, None)
+        if buffer_ is None:
+            buffer_ = numpy.empty(shape, dtype=dtype)
+        buffers[key] = buffer_
+
+        while sum(kept.nbytes for kept in buffers.values()) > max_bytes:
+            buffers.popitem(last=False)
+        return buffer_
+
+    def clear(self):
+        self._by_thread.clear()
+
+
+@contextmanager
+def scratch_buffers():
+    """
+    Context manager reusing the scratch buffers of the fuses within it, and freeing them on exit.
+
+    Each thread keeps up to the ``scratch_buffer_bytes`` option of buffers. Work handed to other threads uses
+    them when wrapped with :func:`bind_scratch_buffers`. Nested uses share the buffers of the outermost one.
+    """
+    if getattr(_SCRATCH, 'buffers', None) is not None:
+        yield
+        return
+
+    _SCRATCH.buffers = buffers = _ScratchBuffers()
+    try:
+        yield
+    finally:
+        _SCRATCH.buffers = None
+        buffers.clear()
+
+
+def bind_scratch_buffers(func):
+    """
+    Wrap `func` to use the scratch buffers of the calling thread, wherever it runs.
+    """
+    buffers = getattr(_SCRATCH, 'buffers', None)
+    if buffers is None:
+        return func
+
+    @functools.wraps(func)
+    def with_scratch_buffers(*args, **kwargs):
+        previous = getattr(_SCRATCH, 'buffers', None)
+        _SCRATCH.buffers = buffers
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _SCRATCH.buffers = previous
+
+    return with_scratch_buffers
+
+
+def _scratch_buffer(shape, dtype, slot=0):
+    """
+    Uninitialised array, reused by later calls from the same thread with the same arguments within
+    :func:`scratch_buffers`.
+
+    The content is only valid until the next such call. The least recently used buffers of a thread are dropped
+    beyond the ``scratch_buffer_bytes`` option.
+
+    :param slot: number distinguishing buffers of the same shape and type needed at the same time
+    """
+    buffers = getattr(_SCRATCH, 'buffers', None)
+    max_bytes = OPTIONS['scratch_buffer_bytes']
+    if buffers is None or max_bytes <= 0:
+        return numpy.empty(shape, dtype=dtype)
+    return buffers.get(shape, dtype, slot, max_bytes)
+
+
+def _reproject_and_fuse_stacked(datasources, destinations, dst_transform, dst_projection, dst_nodata,
+                                resampling, fuser, skip_broken_datasets):
+    """
+    Read every source into a ``(n_sources, y, x)`` stack per band, then reduce each stack with `fuser`.
+    """
+    stacks = [numpy.empty((len(datasources),) + destination.shape, dtype=destination.dtype)
+              for destination in destinations]
+    # Number of sources successfully read, per band
+    counts = [0] * len(destinations)
+
+    band_params = list(zip(stacks, dst_nodata, resampling))
+    for band_sources in datasources:
+        with ignore_exceptions_if(skip_broken_datasets), _open_bands(band_sources) as bands:
+            for index, (src, (stack, nodata, method)) in enumerate(zip(bands, band_params)):
+                with ignore_exceptions_if(skip_broken_datasets):
+                    _read_band(src, stack[counts[index]], dst_transform, nodata, dst_projection, method)
+                    counts[index] += 1
+
+    for destination, stack, count, nodata in zip(destinations, stacks, counts, dst_nodata):
+        if count:
+            with timed('fuse', stack[:count].nbytes):
+                fuser.reduce(stack[:count], nodata, destination)
+        else:
+            destination.fill(nodata)
+
+    return destinations
+
+
+def _reproject_and_fuse_concurrently(datasources, destinations, dst_transform, dst_projection, dst_nodata,
+                                     resampling, fuse_func, skip_broken_datasets, max_concurrent):
+    """
+    Read up to `max_concurrent` sources at once with the shared reader pool, fusing them in order.
+
+    With the default fuser, bands without nodata left are not read from later sources, and no more reads are
+    started once every band is complete.
+    """
+    pool = _reader_pool(max_concurrent)
+    band_params = list(zip(dst_nodata, resampling))
+
+    @bind_stats
+    def read_dataset(band_sources, buffers):
+        """Read all the bands of a dataset into `buffers`, returning which bands were read"""
+        read = [False] * len(buffers)
+        with ignore_exceptions_if(skip_broken_datasets), _open_bands(band_sources) as bands:
+            for band, (src, buffer_, (nodata, method)) in enumerate(zip(bands, buffers, band_params)):
+                if src is None:
+                    continue
+                with ignore_exceptions_if(skip_broken_datasets):
+                    _read_band(src, buffer_, dst_transform, nodata, dst_projection, method)
+                    read[band] = True
+        return read
+
+    if isinstance(fuse_func, StackedFuser):
+        stacks = [numpy.empty((len(datasources),) + destination.shape, dtype=destination.dtype)
+                  for destination in destinations]
+        futures = [pool.submit(read_dataset, band_sources, [stack[index] for stack in stacks])
+                   for index, band_sources in enumerate(datasources)]
+        try:
+            read = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+        for band, (destination, stack, nodata) in enumerate(zip(destinations, stacks, dst_nodata)):
+            stack = stack[numpy.array([dataset_read[band] for dataset_read in read], dtype=bool)]
+            if len(stack):
+                with timed('fuse', stack.nbytes):
+                    fuse_func.reduce(stack, nodata, destination)
+            else:
+                destination.fill(nodata)
+        return destinations
+
+    fuse_funcs = [fuse_func or _copyto_fuser(nodata) for nodata in dst_nodata]
+    for destination, nodata in zip(destinations, dst_nodata):
+        destination.fill(nodata)
+
+    stop_when_complete = fuse_func is None
+    incomplete = [True] * len(destinations)
+    remaining = iter(datasources)
+    # Reads in flight, in fusing order: (buffers, future)
+    pending = deque()
+
+    def submit_next():
+        for band_sources in remaining:
+            band_sources = [source if todo else None for source, todo in zip(band_sources, incomplete)]
+            buffers = [numpy.empty(destination.shape, dtype=destination.dtype) for destination in destinations]
+            pending.append((buffers, pool.submit(read_dataset, band_sources, buffers)))
+            return
+
+    try:
+        for _ in range(max_concurrent):
+            submit_next()
+
+        while pending and any(incomplete):
+            buffers, future = pending.popleft()
+            read = future.result()
+            for band, (destination, buffer_, nodata, fuse) in enumerate(zip(destinations, buffers,
+                                                                            dst_nodata, fuse_funcs)):
+                if not read[band]:
+                    continue
+                with timed('fuse', buffer_.nbytes):
+                    fuse(destination, buffer_)
+                if stop_when_complete:
+                    incomplete[band] = _nodata_mask(destination, nodata).any()
+            if any(incomplete):
+                submit_next()
+    finally:
+        # Reads that haven't started are no longer needed, running ones write into their own buffers
+        for _, future in pending:
+            future.cancel()
+
+    return destinations
+
+
+_READER_POOL = None
+_READER_POOL_LOCK = threading.Lock()
+
+
+def _reader_pool(max_workers):
+    """
+    Process-wide thread pool reading sources concurrently, sized by the `concurrent_reads` option.
+
+    It is shared by all loads, and replaced when the option changes or in a forked process. Replaced pools aren't
+    shut down, as loads started earlier may still be using them: their threads exit once they are unreferenced.
+    """
+    global _READER_POOL  # pylint: disable=global-statement
+    with _READER_POOL_LOCK:
+        if _READER_POOL is None or _READER_POOL[:2] != (os.getpid(), max_workers):
+            _READER_POOL = (os.getpid(), max_workers, ThreadPoolExecutor(max_workers=max_workers))
+        return _READER_POOL[2]
+
+
+def _nodata_mask(array, nodata):
+    """Boolean mask of the `nodata` pixels of `array`, also works for a NaN `nodata`"""
+    if numpy.isnan(nodata):
+        return numpy.isnan(array)
+    return array == nodata
+
+
+def _copyto_fuser(dst_nodata):
     def copyto_fuser(dest, src):
         """
         :type dest: numpy.ndarray
         :type src: numpy.ndarray
         """
-        numpy.copyto(dest, src, where=(dest == dst_nodata))
+        numpy.copyto(dest, src, where=_nodata_mask(dest, dst_nodata))
 
-    fuse_func = fuse_func or copyto_fuser
+    return copyto_fuser
 
-    destination.fill(dst_nodata)
-    if len(datasources) == 0:
-        return destination
-    elif len(datasources) == 1:
-        with ignore_exceptions_if(skip_broken_datasets):
-            read_from_source(datasources[0], destination, dst_transform, dst_nodata, dst_projection, resampling)
-        return destination
-    else:
-        # Multiple sources, we need to fuse them together into a single array
-        buffer_ = numpy.empty(destination.shape, dtype=destination.dtype)
+
+@contextmanager
+def _open_bands(datasources):
+    """
+    Open every data source in `datasources`, yielding a list with the opened band sources.
+
+    :class:`RasterioDataSource` objects that read from the same file share one open file handle.
+    `None` entries are passed through unchanged.
+    """
+    with ExitStack() as stack:
+        handles = {}
+        bands = []
         for source in datasources:
-            with ignore_exceptions_if(skip_broken_datasets):
-                read_from_source(source, buffer_, dst_transform, dst_nodata, dst_projection, resampling)
-                fuse_func(destination, buffer_)
+            if source is None:
+                bands.append(None)
+            elif isinstance(source, RasterioDataSource):
+                if source.filename not in handles:
+                    handles[source.filename] = stack.enter_context(_rasterio_open(source.filename))
+                bands.append(source.band_source(handles[source.filename]))
+            else:
+                bands.append(stack.enter_context(source.open()))
+        yield bands
+
+
+# rasterio.open is looked up on every call, rather than bound once here
+_HANDLE_CACHE = HandleCache(opener=lambda filename: rasterio.open(filename))  # pylint: disable=unnecessary-lambda
+
+
+@contextmanager
+def _rasterio_open(filename):
+    """
+    Context manager which returns an open :class:`rasterio.DatasetReader`
+
+    When the ``file_handle_cache_size`` option is set, the handle is taken from (and returned to)
+    the process-wide cache of open handles, see :func:`file_handle_cache_info`.
+    """
+    try:
+        _LOG.debug("opening %s", filename)
+        cache_size = OPTIONS['file_handle_cache_size']
+        with ExitStack() as stack:
+            with timed('open'):
+                if cache_size > 0:
+                    src = stack.enter_context(_HANDLE_CACHE.open(filename, cache_size,
+                                                                 OPTIONS['file_handle_idle_timeout']))
+                else:
+                    src = stack.enter_context(rasterio.open(filename))
+            yield src
+    except Exception as e:
+        _LOG.error("Error opening source dataset: %s", filename)
+        raise e
+
+
+def file_handle_cache_info():
+    """
+    Statistics of the process-wide cache of open file handles.
 
-        return destination
+    The cache is enabled by setting the ``file_handle_cache_size`` option, eg::
+
+        datacube.set_options(file_handle_cache_size=64)
+
+    :return: named tuple with the number of cache hits and misses, the current number of idle
+             handles and the maximum size of the cache
+    :rtype: datacube.storage._handles.CacheInfo
+    """
+    return _HANDLE_CACHE.info(OPTIONS['file_handle_cache_size'])
+
+
+def clear_file_handle_cache():
+    """Close all cached file handles and reset the cache statistics."""
+    _HANDLE_CACHE.clear()
 
 
 class BandDataSource(object):
@@ -243,6 +1137,11 @@ class BandDataSource(object):
         return self.source.ds.read(indexes=self.source.bidx, window=window, out_shape=out_shape)
 
     def reproject(self, dest, dst_transform, dst_crs, dst_nodata, resampling, **kwargs):
+        overviews = _usable_overviews(self, resampling)
+        if overviews:
+            return _reproject_window(self, dest, dst_transform, dst_crs, dst_nodata, resampling,
+                                     overviews=overviews, **kwargs)
+
         return rasterio.warp.reproject(self.source,
                                        dest,
                                        src_nodata=self.nodata,
@@ -348,17 +1247,8 @@ class OverrideBandDataSource(object):
         return self.source.ds.read(indexes=self.source.bidx, window=window, out_shape=out_shape)
 
     def reproject(self, dest, dst_transform, dst_crs, dst_nodata, resampling, **kwargs):
-        source = self.read()  # TODO: read only the part the we care about
-        return rasterio.warp.reproject(source,
-                                       dest,
-                                       src_transform=self.transform,
-                                       src_crs=str(self.crs),
-                                       src_nodata=self.nodata,
-                                       dst_transform=dst_transform,
-                                       dst_crs=str(dst_crs),
-                                       dst_nodata=dst_nodata,
-                                       resampling=resampling,
-                                       **kwargs)
+        return _reproject_window(self, dest, dst_transform, dst_crs, dst_nodata, resampling,
+                                 overviews=_usable_overviews(self, resampling), **kwargs)
 
 
 class RasterioDataSource(DataSource):
@@ -383,42 +1273,45 @@ class RasterioDataSource(DataSource):
     @contextmanager
     def open(self):
         """Context manager which returns a :class:`BandDataSource`"""
-        try:
-            _LOG.debug("opening %s", self.filename)
-            with rasterio.open(self.filename) as src:
-                override = False
-
-                transform = _rasterio_transform(src)
-                if transform.is_identity:
-                    override = True
-                    transform = self.get_transform(src.shape)
-
-                try:
-                    crs = geometry.CRS(_rasterio_crs_wkt(src))
-                except ValueError:
-                    override = True
-                    crs = self.get_crs()
-
-                # The 1.0 onwards release of rasterio has a bug that means it
-                # cannot read multiband data into a numpy array during reprojection
-                # We override it here to force the reading and reprojection into separate steps
-                # TODO: Remove when rasterio bug fixed
-                bandnumber = self.get_bandnumber(src)
-                if bandnumber > 1 and str(rasterio.__version__) >= '1.0':
-                    override = True
-
-                band = rasterio.band(src, bandnumber)
-                nodata = numpy.dtype(band.dtype).type(src.nodatavals[0] if src.nodatavals[0] is not None
-                                                      else self.nodata)
-
-                if override:
-                    yield OverrideBandDataSource(band, nodata=nodata, crs=crs, transform=transform)
-                else:
-                    yield BandDataSource(band, nodata=nodata)
+        with _rasterio_open(self.filename) as src:
+            yield self.band_source(src)
 
-        except Exception as e:
-            _LOG.error("Error opening source dataset: %s", self.filename)
-            raise e
+    def band_source(self, src):
+        """
+        Wrap the band of interest of an already opened file.
+
+        :param rasterio.DatasetReader src: the open file, as returned by :func:`rasterio.open`
+        :rtype: BandDataSource or OverrideBandDataSource
+        """
+        override = False
+
+        transform = _rasterio_transform(src)
+        if transform.is_identity:
+            override = True
+            transform = self.get_transform(src.shape)
+
+        try:
+            crs = geometry.CRS(_rasterio_crs_wkt(src))
+        except ValueError:
+            override = True
+            crs = self.get_crs()
+
+        # The 1.0 onwards release of rasterio has a bug that means it
+        # cannot read multiband data into a numpy array during reprojection
+        # We override it here to force the reading and reprojection into separate steps
+        # TODO: Remove when rasterio bug fixed
+        bandnumber = self.get_bandnumber(src)
+        if bandnumber > 1 and str(rasterio.__version__) >= '1.0':
+            override = True
+
+        band = rasterio.band(src, bandnumber)
+        nodata = numpy.dtype(band.dtype).type(src.nodatavals[0] if src.nodatavals[0] is not None
+                                              else self.nodata)
+
+        if override:
+            return OverrideBandDataSource(band, nodata=nodata, crs=crs, transform=transform)
+        else:
+            return BandDataSource(band, nodata=nodata)
 
 
 class RasterFileDataSource(RasterioDataSource):
@@ -166,6 +166,12 @@ except ImportError:
 
 
 def intersects(a, b):
+    """
+    Whether the interiors of geometries `a` and `b` intersect
+
+    When testing many geometries against the same one, pass it prepared as `a`, see
+    :meth:`datacube.utils.geometry.Geometry.prepare`.
+    """
     return a.intersects(b) and not a.touches(b)
 
 
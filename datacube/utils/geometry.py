@@ -2,6 +2,7 @@ from __future__ import absolute_import, division
 
 import functools
 import math
+import threading
 from collections import namedtuple, OrderedDict
 
 import cachetools
@@ -12,6 +13,12 @@ from rasterio.coords import BoundingBox as _BoundingBox
 
 from datacube import compat
 
+try:
+    from shapely import wkb as shapely_wkb
+    from shapely.prepared import prep as shapely_prep
+except ImportError:
+    shapely_wkb = shapely_prep = None
+
 Coordinate = namedtuple('Coordinate', ('values', 'units'))
 
 
@@ -48,7 +55,6 @@ class InvalidCRSError(ValueError):
     pass
 
 
-@cachetools.cached({})
 def _make_crs(crs_str):
     crs = osr.SpatialReference()
 
@@ -66,10 +72,63 @@ def _make_crs(crs_str):
     return crs
 
 
+def _normalise_crs_str(crs_str):
+    """Key of `crs_str` in the CRS registry: surrounding whitespace removed and EPSG codes in upper case"""
+    crs_str = crs_str.strip()
+    if crs_str[:5].lower() == 'epsg:':
+        crs_str = 'EPSG:' + crs_str[5:].strip()
+    return crs_str
+
+
+def _authority_code(crs):
+    if crs.IsProjected():
+        code = crs.GetAuthorityCode('PROJCS')
+    elif crs.IsGeographic():
+        code = crs.GetAuthorityCode('GEOGCS')
+    else:
+        code = None
+    return int(code) if code else None
+
+
+def _proj4_tokens(crs):
+    return frozenset(crs.ExportToProj4().split() + ['+wktext'])
+
+
+def _coarse_hash(crs):
+    """Hash shared by every CRS that may compare equal to `crs`: its kind and ellipsoid size"""
+    return hash((crs.IsGeographic() == 1, int(round(crs.GetSemiMajor()))))
+
+
+#: Recently created CRSs, by normalised string. CRS objects are immutable and shared.
+_CRS_REGISTRY = cachetools.LRUCache(maxsize=1024)
+_CRS_REGISTRY_LOCK = threading.Lock()
+
+#: Whether two CRSs with different normalised strings are the same, by that pair of strings
+_CRS_EQUALITY = cachetools.LRUCache(maxsize=1024)
+_CRS_EQUALITY_LOCK = threading.Lock()
+
+
+def _is_same_crs(left, right):
+    """Compare two :class:`CRS` with GDAL, caching the result as GDAL is slow at it"""
+    # pylint: disable=protected-access
+    key = (left._crs_str, right._crs_str) if left._crs_str <= right._crs_str else (right._crs_str, left._crs_str)
+    with _CRS_EQUALITY_LOCK:
+        same = _CRS_EQUALITY.get(key)
+    if same is None:
+        same = left._crs.IsSame(right._crs) == 1
+        with _CRS_EQUALITY_LOCK:
+            _CRS_EQUALITY[key] = same
+    return same
+
+
 class CRS(object):
     """
     Wrapper around `osr.SpatialReference` providing a more pythonic interface
 
+    Instances are interned: constructing a recently used CRS from the same string returns the same immutable
+    object, so creating one is usually a dictionary lookup. CRSs are equal if they are the same object, have the
+    same *Proj.4* representation, or *GDAL* considers them the same.
+
     >>> crs = CRS('EPSG:3577')
     >>> crs.geographic
     False
@@ -93,6 +152,8 @@ class CRS(object):
     ('y', 'x')
     >>> CRS('EPSG:3577') == CRS('EPSG:3577')
     True
+    >>> CRS('EPSG:3577') is CRS('epsg:3577')
+    True
     >>> CRS('EPSG:3577') == CRS('EPSG:4326')
     False
     >>> # Due to Py 2 and 3 inconsistency in traceback formatting, we need to wrap the exceptions. Yuck.
@@ -111,6 +172,40 @@ class CRS(object):
     ...    print(e)
     Not a valid CRS: 'PROJCS["...
     """
+    __slots__ = ('_crs_str', '_crs', '_epsg', '_proj4', '_hash', '__weakref__')
+
+    def __new__(cls, crs_str):
+        if isinstance(crs_str, CRS):
+            if cls is CRS:
+                return crs_str
+            crs_str = crs_str.crs_str
+
+        if isinstance(crs_str, compat.string_types):
+            crs_str = _normalise_crs_str(crs_str)
+
+        if cls is not CRS:
+            # Instances of subclasses aren't shared, so they don't leak into plain CRS(...) calls
+            return cls._create(crs_str)
+
+        with _CRS_REGISTRY_LOCK:
+            crs = _CRS_REGISTRY.get(crs_str)
+        if crs is not None:
+            return crs
+
+        crs = cls._create(crs_str)
+        with _CRS_REGISTRY_LOCK:
+            # Another thread may have created it meanwhile, keep theirs so there is only one
+            return _CRS_REGISTRY.setdefault(crs_str, crs)
+
+    @classmethod
+    def _create(cls, crs_str):
+        crs = object.__new__(cls)
+        crs._crs_str = crs_str
+        crs._crs = _make_crs(crs_str)
+        crs._epsg = _authority_code(crs._crs)
+        crs._proj4 = _proj4_tokens(crs._crs)
+        crs._hash = _coarse_hash(crs._crs)
+        return crs
 
     def __init__(self, crs_str):
         """
@@ -118,19 +213,21 @@ class CRS(object):
         :param crs_str: string representation of a CRS, often an EPSG code like 'EPSG:4326'
         :raises: InvalidCRSError
         """
-        if isinstance(crs_str, CRS):
-            crs_str = crs_str.crs_str
-        self.crs_str = crs_str
-        self._crs = _make_crs(crs_str)
 
     def __getitem__(self, item):
         return self._crs.GetAttrValue(item)
 
-    def __getstate__(self):
-        return {'crs_str': self.crs_str}
+    def __reduce__(self):
+        return CRS, (self._crs_str,)
 
-    def __setstate__(self, state):
-        self.__init__(state['crs_str'])
+    @property
+    def crs_str(self):
+        """
+        String the CRS was created from
+
+        :type: str
+        """
+        return self._crs_str
 
     @property
     def wkt(self):
@@ -144,17 +241,11 @@ class CRS(object):
     @property
     def epsg(self):
         """
-        EPSG Code of the CRS
+        EPSG Code of the CRS, or None if it doesn't have one
 
         :type: int
         """
-        if self.projected:
-            return int(self._crs.GetAuthorityCode('PROJCS'))
-
-        if self.geographic:
-            return int(self._crs.GetAuthorityCode('GEOGCS'))
-
-        return None
+        return self._epsg
 
     @property
     def proj(self):
@@ -225,20 +316,25 @@ class CRS(object):
     def __eq__(self, other):
         if isinstance(other, compat.string_types):
             other = CRS(other)
-        gdal_thinks_issame = self._crs.IsSame(other._crs) == 1  # pylint: disable=protected-access
-        if gdal_thinks_issame:
+        if not isinstance(other, CRS):
+            return NotImplemented
+        if self is other:
             return True
-
-        def to_canonincal_proj4(crs):
-            return set(crs.ExportToProj4().split() + ['+wktext'])
-        proj4_repr_is_same = to_canonincal_proj4(self._crs) == to_canonincal_proj4(other._crs)  # pylint: disable=protected-access
-        return proj4_repr_is_same
+        # pylint: disable=protected-access
+        if self._hash != other._hash:
+            return False
+        return self._proj4 == other._proj4 or _is_same_crs(self, other)
 
     def __ne__(self, other):
-        if isinstance(other, compat.string_types):
-            other = CRS(other)
-        assert isinstance(other, self.__class__)
-        return self._crs.IsSame(other._crs) != 1  # pylint: disable=protected-access
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        # Coarse, as equality is looser than any canonical form: CRSs can be the same to GDAL in spite of
+        # different Proj.4 representations
+        return self._hash
 
 
 ###################################################
@@ -456,6 +552,14 @@ class Geometry(object):
     def simplify(self, tolerance):
         return _make_geom_from_ogr(self._geom.Simplify(tolerance), self.crs)
 
+    def prepare(self):
+        """
+        Prepare the geometry for testing many other geometries against it
+
+        :rtype: PreparedGeometry
+        """
+        return PreparedGeometry(self)
+
     def to_crs(self, crs, resolution=None, wrapdateline=False):
         """
         Convert geometry to a different Coordinate Reference System
@@ -466,23 +570,7 @@ class Geometry(object):
                                   Currently only works in few specific cases (source CRS is smooth over the dateline).
         :rtype: Geometry
         """
-        if self.crs == crs:
-            return self
-
-        if resolution is None:
-            resolution = 1 if self.crs.geographic else 100000
-
-        transform = osr.CoordinateTransformation(self.crs._crs, crs._crs)  # pylint: disable=protected-access
-        clone = self._geom.Clone()
-
-        if wrapdateline and crs.geographic:
-            rtransform = osr.CoordinateTransformation(crs._crs, self.crs._crs)  # pylint: disable=protected-access
-            clone = _chop_along_antimeridian(clone, transform, rtransform)
-
-        clone.Segmentize(resolution)
-        clone.Transform(transform)
-
-        return _make_geom_from_ogr(clone, crs)  # pylint: disable=protected-access
+        return geometries_to_crs([self], crs, resolution=resolution, wrapdateline=wrapdateline)[0]
 
     def __iter__(self):
         for i in range(self._geom.GetGeometryCount()):
@@ -513,6 +601,152 @@ class Geometry(object):
         self.__init__(**state)
 
 
+def _envelopes_intersect(a, b):
+    return a.left <= b.right and b.left <= a.right and a.bottom <= b.top and b.bottom <= a.top
+
+
+def _envelope_contains(a, b):
+    return a.left <= b.left and b.right <= a.right and a.bottom <= b.bottom and b.top <= a.top
+
+
+def _to_shapely(geom):
+    return shapely_wkb.loads(bytes(geom._geom.ExportToWkb()))  # pylint: disable=protected-access
+
+
+class PreparedGeometry(object):
+    """
+    Geometry prepared for testing many other geometries against, see :meth:`Geometry.prepare`
+
+    Predicates compare bounding boxes first, which rules out most geometries when testing against a polygon
+    much larger than them. When shapely is installed the remaining tests use a GEOS prepared geometry, which
+    indexes the edges of the geometry once instead of on every test.
+
+    Supports the same predicates as :class:`Geometry` that can use the preparation, so it can be passed to
+    :func:`datacube.utils.intersects` in place of the geometry.
+    """
+
+    def __init__(self, geom):
+        #: :type: Geometry
+        self.geom = geom
+        self._envelope = None if geom.is_empty else geom.envelope
+        self._prepared = None
+        if shapely_prep is not None and self._envelope is not None:
+            self._prepared = shapely_prep(_to_shapely(geom))
+
+    @property
+    def crs(self):
+        return self.geom.crs
+
+    def intersects(self, other):
+        if self._envelope is None or other.is_empty or not _envelopes_intersect(self._envelope, other.envelope):
+            return False
+        if self._prepared is None:
+            return self.geom.intersects(other)
+        return self._prepared.intersects(_to_shapely(other))
+
+    def touches(self, other):
+        if self._envelope is None or other.is_empty or not _envelopes_intersect(self._envelope, other.envelope):
+            return False
+        if self._prepared is None:
+            return self.geom.touches(other)
+        return self._prepared.touches(_to_shapely(other))
+
+    def contains(self, other):
+        if self._envelope is None or other.is_empty or not _envelope_contains(self._envelope, other.envelope):
+            return False
+        if self._prepared is None:
+            return self.geom.contains(other)
+        return self._prepared.contains(_to_shapely(other))
+
+    def disjoint(self, other):
+        return not self.intersects(other)
+
+    def __repr__(self):
+        return 'PreparedGeometry(%r)' % self.geom
+
+
+#: Number of coordinate transformations cached by each thread
+TRANSFORM_CACHE_SIZE = 64
+
+_TRANSFORMS = threading.local()
+
+
+def _get_transform(src_crs, dst_crs):
+    """
+    Return an `osr.CoordinateTransformation` from `src_crs` to `dst_crs`, creating it only once per thread.
+
+    Transformations are not thread safe, so each thread keeps an LRU cache of its own.
+    """
+    cache = getattr(_TRANSFORMS, 'cache', None)
+    if cache is None:
+        cache = _TRANSFORMS.cache = cachetools.LRUCache(maxsize=TRANSFORM_CACHE_SIZE)
+
+    key = (src_crs, dst_crs)
+    transform = cache.get(key)
+    if transform is None:
+        transform = osr.CoordinateTransformation(src_crs._crs, dst_crs._crs)  # pylint: disable=protected-access
+        cache[key] = transform
+    return transform
+
+
+def transform_points(xs, ys, src_crs, dst_crs):
+    """
+    Convert arrays of point coordinates from `src_crs` to `dst_crs` in a single call
+
+    :param xs: x coordinates
+    :param ys: y coordinates, of the same shape as `xs`
+    :param CRS src_crs: CRS of the points
+    :param CRS dst_crs: CRS to convert to
+    :return: (x coordinates, y coordinates) in `dst_crs`
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    xs = numpy.asarray(xs, dtype='float64')
+    ys = numpy.asarray(ys, dtype='float64')
+    if src_crs == dst_crs or xs.size == 0:
+        return xs.copy(), ys.copy()
+
+    points = numpy.array(_get_transform(src_crs, dst_crs).TransformPoints(
+        numpy.column_stack((xs.ravel(), ys.ravel())).tolist()), dtype='float64')
+    return points[:, 0].reshape(xs.shape), points[:, 1].reshape(ys.shape)
+
+
+def geometries_to_crs(geoms, crs, resolution=None, wrapdateline=False):
+    """
+    Convert many geometries to `crs`, see :meth:`Geometry.to_crs`.
+
+    Geometries already in `crs` are returned as they are. The coordinate transformation of each source CRS
+    is only looked up once.
+
+    :param geoms: iterable of :class:`Geometry`
+    :param CRS crs: CRS to convert to
+    :rtype: list[Geometry]
+    """
+    converted = []
+    transforms = {}
+    for geom in geoms:
+        if geom.crs == crs:
+            converted.append(geom)
+            continue
+
+        src_crs = geom.crs
+        if src_crs not in transforms:
+            transforms[src_crs] = (_get_transform(src_crs, crs),
+                                   _get_transform(crs, src_crs) if wrapdateline and crs.geographic else None)
+        transform, rtransform = transforms[src_crs]
+
+        segment_length = resolution
+        if segment_length is None:
+            segment_length = 1 if src_crs.geographic else 100000
+
+        clone = geom._geom.Clone()  # pylint: disable=protected-access
+        if rtransform is not None:
+            clone = _chop_along_antimeridian(clone, transform, rtransform)
+        clone.Segmentize(segment_length)
+        clone.Transform(transform)
+        converted.append(_make_geom_from_ogr(clone, crs))
+    return converted
+
+
 def _dist(x, y):
     return x*x + y*y
 
@@ -708,20 +942,52 @@ class GeoBox(object):
     Defines the location and resolution of a rectangular grid of data,
     including it's :py:class:`CRS`.
 
+    GeoBoxes are immutable. The `extent` and `coordinates` are only computed when first used, and pickling
+    only stores the size, affine and CRS.
+
     :param geometry.CRS crs: Coordinate Reference System
     :param affine.Affine affine: Affine transformation defining the location of the geobox
     """
+    __slots__ = ('_width', '_height', '_affine', '_crs', '_extent', '_coordinates')
 
     def __init__(self, width, height, affine, crs):
         assert height > 0 and width > 0, "Can't create GeoBox of zero size"
-        #: :type: int
-        self.width = width
-        #: :type: int
-        self.height = height
-        #: :rtype: affine.Affine
-        self.affine = affine
-        #: :rtype: geometry.Geometry
-        self.extent = polygon_from_transform(width, height, affine, crs=crs)
+        self._width = width
+        self._height = height
+        self._affine = affine
+        self._crs = crs
+        self._extent = None
+        self._coordinates = None
+
+    @property
+    def width(self):
+        """
+        :type: int
+        """
+        return self._width
+
+    @property
+    def height(self):
+        """
+        :type: int
+        """
+        return self._height
+
+    @property
+    def affine(self):
+        """
+        :rtype: affine.Affine
+        """
+        return self._affine
+
+    @property
+    def extent(self):
+        """
+        :rtype: geometry.Geometry
+        """
+        if self._extent is None:
+            self._extent = polygon_from_transform(self._width, self._height, self._affine, crs=self._crs)
+        return self._extent
 
     @classmethod
     def from_geopolygon(cls, geopolygon, resolution, crs=None, align=None):
@@ -755,17 +1021,34 @@ class GeoBox(object):
         return self[-h:self.height+h, -w:self.width+w]
 
     def __getitem__(self, item):
-        indexes = [slice(index.start or 0, index.stop or size, index.step or 1)
-                   for size, index in zip(self.shape, item)]
-        for index in indexes:
-            if index.step != 1:
-                raise NotImplementedError('scaling not implemented, yet')
+        y_index, x_index = item
+        y_start, y_stop = y_index.start or 0, y_index.stop or self._height
+        x_start, x_stop = x_index.start or 0, x_index.stop or self._width
+        if (y_index.step or 1) != 1 or (x_index.step or 1) != 1:
+            raise NotImplementedError('scaling not implemented, yet')
+
+        affine = self._affine
+        if x_start or y_start:
+            affine = affine * Affine.translation(x_start, y_start)
+        return GeoBox(width=x_stop - x_start, height=y_stop - y_start, affine=affine, crs=self._crs)
+
+    def __eq__(self, other):
+        if not isinstance(other, GeoBox):
+            return NotImplemented
+        return (self._width == other._width and self._height == other._height and  # pylint: disable=protected-access
+                self._affine == other._affine and self._crs == other._crs)  # pylint: disable=protected-access
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
 
-        affine = self.affine * Affine.translation(indexes[1].start, indexes[0].start)
-        return GeoBox(width=indexes[1].stop - indexes[1].start,
-                      height=indexes[0].stop - indexes[0].start,
-                      affine=affine,
-                      crs=self.crs)
+    def __hash__(self):
+        return hash((self._width, self._height, tuple(self._affine)[:6], self._crs))
+
+    def __reduce__(self):
+        return _make_geobox, (self._width, self._height, tuple(self._affine)[:6], _crs_pickle_str(self._crs))
 
     @property
     def transform(self):
@@ -783,7 +1066,7 @@ class GeoBox(object):
         """
         :rtype: CRS
         """
-        return self.extent.crs
+        return self._crs
 
     @property
     def dimensions(self):
@@ -817,13 +1100,16 @@ class GeoBox(object):
         """
         dict of coordinate labels
 
+        The labels are computed once, every call returns new arrays that are safe to modify.
+
         :type: dict[str,numpy.array]
         """
-        xs = numpy.arange(self.width) * self.affine.a + (self.affine.c + self.affine.a / 2)
-        ys = numpy.arange(self.height) * self.affine.e + (self.affine.f + self.affine.e / 2)
-
-        return OrderedDict((dim, Coordinate(labels, units)) for dim, labels, units in zip(self.crs.dimensions,
-                                                                                          (ys, xs), self.crs.units))
+        if self._coordinates is None:
+            xs = numpy.arange(self.width) * self.affine.a + (self.affine.c + self.affine.a / 2)
+            ys = numpy.arange(self.height) * self.affine.e + (self.affine.f + self.affine.e / 2)
+            self._coordinates = tuple((dim, Coordinate(labels, units))
+                                      for dim, labels, units in zip(self.crs.dimensions, (ys, xs), self.crs.units))
+        return OrderedDict((dim, Coordinate(coord.values.copy(), coord.units)) for dim, coord in self._coordinates)
 
     @property
     def geographic_extent(self):
@@ -845,10 +1131,24 @@ class GeoBox(object):
             width=self.width,
             height=self.height,
             affine=self.affine,
-            crs=self.extent.crs
+            crs=self.crs
         )
 
 
+def _crs_pickle_str(crs):
+    """Short string to pickle `crs` as: its EPSG code if it has one, rather than a full WKT"""
+    if crs is None:
+        return None
+    if crs.epsg is not None:
+        return 'EPSG:%d' % crs.epsg
+    return crs.crs_str
+
+
+def _make_geobox(width, height, affine, crs):
+    """Unpickle a :class:`GeoBox`"""
+    return GeoBox(width, height, Affine(*affine), None if crs is None else CRS(crs))
+
+
 def _round_to_res(value, res, acc=0.1):
     """
     >>> _round_to_res(0.2, 1.0)
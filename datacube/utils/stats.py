@@ -0,0 +1,208 @@
+# coding=utf-8
+"""
+Timings and counters of the steps of loading data.
+
+Statistics are only gathered within :func:`collect_stats`. Outside of it, instrumented code only checks
+whether any collector is active, so there is no measurable overhead.
+::
+
+    from datacube.utils.stats import collect_stats
+
+    with collect_stats() as stats:
+        data = dc.load(product='ls5_nbar_albers', ...)
+    print(stats)
+
+Stats are collected for the thread entering :func:`collect_stats`, and for the worker threads its loads start,
+so loads running concurrently in other threads are not counted. Code handing work to a thread pool passes the
+collectors along with :func:`bind_stats`.
+"""
+from __future__ import absolute_import, division
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+_LOG = logging.getLogger(__name__)
+
+#: Collectors active in each thread, as an `active` tuple
+_LOCAL = threading.local()
+
+
+def _active():
+    return getattr(_LOCAL, 'active', ())
+
+
+class StepStats(object):
+    """
+    Counters of one instrumented step.
+
+    :ivar int calls: number of times the step ran
+    :ivar float seconds: total time spent in the step
+    :ivar int bytes: total number of bytes processed by the step, where known
+    """
+    __slots__ = ('calls', 'seconds', 'bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def __repr__(self):
+        return 'StepStats(calls={}, seconds={:.3f}, bytes={})'.format(self.calls, self.seconds, self.bytes)
+
+
+class LoadStats(object):
+    """
+    Statistics of the steps of a load, by step name.
+
+    Steps are ``index_search``, ``open`` (opening files), ``read`` (reading pixels without reprojection),
+    ``resample`` (resampling at an integer ratio), ``reproject`` (reading with a warp) and ``fuse``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = OrderedDict()
+
+    def record(self, step, seconds, nbytes=0):
+        """Add a run of `step` taking `seconds` and processing `nbytes`"""
+        with self._lock:
+            stats = self._steps.get(step)
+            if stats is None:
+                stats = self._steps[step] = StepStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes += nbytes
+
+    def __getitem__(self, step):
+        """
+        :rtype: StepStats
+        """
+        with self._lock:
+            return self._steps.get(step) or StepStats()
+
+    def as_dict(self):
+        """
+        :return: {step name: {'calls': ..., 'seconds': ..., 'bytes': ...}}, eg. to send to a metrics system
+        """
+        with self._lock:
+            return OrderedDict((step, {'calls': stats.calls, 'seconds': stats.seconds, 'bytes': stats.bytes})
+                               for step, stats in self._steps.items())
+
+    def __repr__(self):
+        lines = ['{:<14} {:>8} {:>10} {:>14}'.format('step', 'calls', 'seconds', 'bytes')]
+        lines.extend('{:<14} {:>8} {:>10.3f} {:>14}'.format(step, stats['calls'], stats['seconds'], stats['bytes'])
+                     for step, stats in self.as_dict().items())
+        return '\n'.join(lines)
+
+
+@contextmanager
+def collect_stats(sink=None):
+    """
+    Context manager collecting statistics of the loads done within it.
+
+    :param sink: optional function called with the :class:`LoadStats` on exit, eg. :func:`log_stats`
+    :rtype: LoadStats
+    """
+    stats = LoadStats()
+    _LOCAL.active = _active() + (stats,)
+    try:
+        yield stats
+    finally:
+        _LOCAL.active = tuple(active for active in _active() if active is not stats)
+        if sink is not None:
+            sink(stats)
+
+
+def bind_stats(func):
+    """
+    Wrap `func` to record its stats to the collectors of the calling thread, wherever it runs.
+
+    Used when handing work to other threads, eg. ``executor.submit(bind_stats(func), ...)``.
+    """
+    active = _active()
+    if not active:
+        return func
+
+    @functools.wraps(func)
+    def with_stats(*args, **kwargs):
+        previous = _active()
+        _LOCAL.active = active
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _LOCAL.active = previous
+
+    return with_stats
+
+
+def log_stats(logger=None, level=logging.INFO):
+    """
+    Sink for :func:`collect_stats` writing the statistics to `logger`.
+
+    :param logging.Logger logger: logger to use, defaults to the one of this module
+    """
+    logger = logger or _LOG
+
+    def sink(stats):
+        logger.log(level, 'Load statistics:\n%s', stats)
+
+    return sink
+
+
+class _Timer(object):
+    __slots__ = ('step', 'nbytes', 'start')
+
+    def __init__(self, step, nbytes):
+        self.step = step
+        self.nbytes = nbytes
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        for stats in _active():
+            stats.record(self.step, seconds, self.nbytes)
+
+
+class _NullTimer(object):
+    """Stand-in for :class:`_Timer` when no stats are collected, ignoring everything"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    @property
+    def nbytes(self):
+        return 0
+
+    @nbytes.setter
+    def nbytes(self, value):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(step, nbytes=0):
+    """
+    Context manager timing `step` when stats are being collected.
+
+    The number of bytes processed can be given upfront, or set on the returned object within the block.
+    ::
+
+        with timed('read') as timer:
+            data = src.read()
+            timer.nbytes = data.nbytes
+    """
+    if not _active():
+        return _NULL_TIMER
+    return _Timer(step, nbytes)
@@ -17,7 +17,7 @@ tests_require = [
 ]
 
 extras_require = {
-    'performance': ['ciso8601', 'bottleneck'],
+    'performance': ['ciso8601', 'bottleneck', 'shapely'],
     'interactive': ['matplotlib', 'fiona'],
     'distributed': ['distributed', 'dask[distributed]'],
     'doc': ['Sphinx', 'setuptools'],
@@ -1,7 +1,20 @@
 from datacube.api.query import GroupBy
+from datacube.api.core import _order_by_overlap, _intersecting_datasets, _row_blocks, _make_dask_arrays, \
+    _iter_prefetched, _fuse_measurements
+from datacube.storage.storage import RasterFileDataSource, read_from_source, Resampling, _scratch_buffer
 
+import datacube
 from datacube import Datacube
+from datacube.utils import geometry
+from affine import Affine
+import dask
 import datetime
+import uuid
+from collections import OrderedDict
+import mock
+import numpy
+import pytest
+import xarray
 
 
 def test_grouping_datasets():
@@ -50,3 +63,349 @@ def _group_datasets_by_date(datasets):
 
     group_by = GroupBy(dimension, group_func, units, sort_key)
     return Datacube.group_datasets(datasets, group_by)
+
+
+def test_order_by_overlap():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(100, 100, Affine(1, 0, 0, 0, -1, 100), crs)
+
+    def dataset(left, bottom, right, top):
+        return mock.Mock(extent=geometry.box(left, bottom, right, top, crs=crs))
+
+    small = dataset(90, 90, 150, 150)
+    large = dataset(-10, -10, 80, 80)
+    outside = dataset(200, 200, 300, 300)
+    no_extent = mock.Mock(extent=None)
+    also_small = dataset(-50, 90, 10, 150)
+
+    ordered = _order_by_overlap([outside, small, no_extent, large, also_small], geobox)
+    assert ordered == [large, small, also_small, outside, no_extent]
+
+
+def test_intersecting_datasets():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(100, 100, Affine(1, 0, 0, 0, -1, 100), crs)
+
+    def dataset(left, bottom, right, top, crs=crs):
+        return mock.Mock(id='same-id', extent=geometry.box(left, bottom, right, top, crs=crs))
+
+    inside = dataset(10, 10, 20, 20)
+    overlapping = dataset(90, 90, 150, 150)
+    touching_kernel = dataset(101, 10, 150, 20)
+    outside = dataset(200, 200, 300, 300)
+    far_away = dataset(140, -40, 150, -30, crs=geometry.CRS('EPSG:4326'))
+    no_extent = mock.Mock(id='same-id', extent=None)
+
+    datasets = [inside, outside, overlapping, far_away, no_extent, touching_kernel]
+    assert _intersecting_datasets(datasets, geobox) == [inside, overlapping, no_extent, touching_kernel]
+    assert _intersecting_datasets([outside, far_away], geobox) == []
+
+    # An updated extent is used straight away
+    outside.extent = geometry.box(10, 10, 20, 20, crs=crs)
+    assert _intersecting_datasets([outside], geobox) == [outside]
+
+
+def test_row_blocks():
+    assert _row_blocks(10, 1) == [slice(0, 10)]
+    assert _row_blocks(10, 3) == [slice(0, 3), slice(3, 6), slice(6, 10)]
+    assert _row_blocks(2, 5) == [slice(0, 1), slice(1, 2)]
+
+
+def test_threaded_load_matches_serial_load():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(50, 40, Affine(1, 0, 0, 0, -1, 40), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1, 'units': '1'},
+                    {'name': 'b', 'dtype': 'float32', 'nodata': numpy.nan, 'units': '1'}]
+
+    sources = numpy.empty((3,), dtype=object)
+    for index in range(3):
+        sources[index] = (index,)
+    sources = xarray.DataArray(sources, dims=['time'], coords={'time': [datetime.datetime(2016, 1, day)
+                                                                        for day in (1, 2, 3)]})
+
+    scratch = []
+
+    def fake_fuse(dests, datasets, geobox, measurements, **kwargs):
+        scratch.append(_scratch_buffer((2, 2), 'int16'))
+        # Encode the time index and the geographic position of each pixel
+        row_offset = 40 - geobox.affine.f
+        for dest in dests:
+            dest[:] = numpy.arange(dest.size).reshape(dest.shape) + row_offset * geobox.width + datasets[0] * 10000
+
+    with mock.patch('datacube.api.core._fuse_measurements', side_effect=fake_fuse) as fuse:
+        serial = Datacube.load_data(sources, geobox, measurements)
+        assert fuse.call_count == 3
+        # Scratch buffers are reused for the whole load, and freed at the end
+        assert all(buffer_ is scratch[0] for buffer_ in scratch)
+        assert datacube.storage.storage._SCRATCH.buffers is None
+
+        fuse.reset_mock()
+        threaded = Datacube.load_data(sources, geobox, measurements, use_threads=8)
+        assert fuse.call_count == 3 * 3
+
+    assert serial.a.shape == (3, 40, 50)
+    assert (serial.a.values == threaded.a.values).all()
+    assert (serial.b.values == threaded.b.values).all()
+
+
+@pytest.fixture
+def example_file_load(example_gdal_path):
+    """
+    Function loading two time slices of datasets read from the example file with :meth:`Datacube.load_data`, and
+    the pixels expected in each slice.
+    """
+    crs = geometry.CRS('EPSG:4326')
+    # A quarter of the resolution of the file, overhanging its top left corner
+    geobox = geometry.GeoBox(40, 30, Affine(0.001, 0, 150.98, 0, -0.001, -28.99), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -999, 'units': '1'}]
+
+    def new_datasource(*args):
+        return RasterFileDataSource(example_gdal_path, bandnumber=1, nodata=-999)
+
+    expected = numpy.empty(geobox.shape, dtype='int16')
+    read_from_source(new_datasource(), expected, geobox.affine, -999, crs, Resampling.nearest)
+    assert (expected[:10] == -999).all() and (expected[:, :20] == -999).all()
+    assert (expected[10:, 20:] == 0).all()
+
+    def dataset(uri):
+        id_ = str(uuid.uuid4())
+        return mock.Mock(id=id_, uris=[uri], metadata_doc={'id': id_}, extent=geometry.box(151, -30, 152, -29, crs))
+
+    first, second = dataset('file:///data/first.tif'), dataset('file:///data/second.tif')
+    sources = numpy.empty((2,), dtype=object)
+    sources[0] = (first, second)
+    sources[1] = (second,)
+    sources = xarray.DataArray(sources, dims=['time'], coords={'time': [datetime.datetime(2016, 1, day)
+                                                                        for day in (1, 2)]})
+
+    def load(**kwargs):
+        with mock.patch('datacube.api.core.new_datasource', side_effect=new_datasource):
+            return Datacube.load_data(sources, geobox, measurements, **kwargs).a.values
+
+    return load, expected
+
+
+def test_threaded_load_from_file(example_file_load):
+    load, expected = example_file_load
+    assert (load() == expected).all()
+    assert (load(use_threads=4) == expected).all()
+    assert (load(use_threads=True) == expected).all()
+
+
+def test_dask_arrays_load_all_measurements_in_one_task():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(50, 40, Affine(1, 0, 0, 0, -1, 40), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1},
+                    {'name': 'b', 'dtype': 'int16', 'nodata': -2}]
+
+    sources = numpy.empty((2,), dtype=object)
+    sources[0] = (mock.Mock(id=1, extent=geobox.extent),)
+    sources[1] = ()
+    sources = xarray.DataArray(sources, dims=['time'])
+
+    def fake_fuse(dests, datasets, geobox, measurements, **kwargs):
+        for band, dest in enumerate(dests):
+            dest[:] = band
+
+    arrays = _make_dask_arrays(sources, geobox, measurements, dask_chunks={'time': 1, 'x': 25, 'y': 20})
+    assert list(arrays) == ['a', 'b']
+    assert arrays['a'].chunks == ((1, 1), (20, 20), (25, 25))
+
+    with mock.patch('datacube.api.core._fuse_measurements', side_effect=fake_fuse) as fuse:
+        a, b = dask.compute(arrays['a'], arrays['b'], scheduler='sync')
+
+    # One task per chunk with data, none for the empty time slice
+    assert fuse.call_count == 4
+    assert (a[0] == 0).all() and (b[0] == 1).all()
+    assert (a[1] == -1).all() and (b[1] == -2).all()
+
+
+def test_iter_prefetched():
+    loaded = []
+
+    def load(item):
+        loaded.append(item)
+        return item * 2
+
+    assert list(_iter_prefetched(load, range(5), prefetch=0)) == [0, 2, 4, 6, 8]
+    assert list(_iter_prefetched(load, range(5), prefetch=2)) == [0, 2, 4, 6, 8]
+
+    del loaded[:]
+    results = _iter_prefetched(load, range(100), prefetch=2)
+    assert next(results) == 0
+    results.close()
+    # Only the prefetched items were loaded
+    assert len(loaded) <= 3
+
+
+def test_load_iter_yields_one_group_at_a_time():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(5, 4, Affine(1, 0, 0, 0, -1, 4), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1, 'units': '1'}]
+    grouped = _group_datasets_by_date([
+        {'time': datetime.datetime(2016, 1, 1), 'value': 'foo'},
+        {'time': datetime.datetime(2016, 2, 1), 'value': 'bar'},
+        {'time': datetime.datetime(2016, 3, 1), 'value': 'baz'},
+    ])
+
+    dc = Datacube(index=mock.Mock())
+    with mock.patch.object(dc, '_prepare_load', return_value=(grouped, geobox, measurements)), \
+            mock.patch('datacube.api.core._fuse_measurements') as fuse:
+        slices = list(dc.load_iter(product='foo', prefetch=1))
+
+    assert fuse.call_count == 3
+    assert [data.time.size for data in slices] == [1, 1, 1]
+    assert [data.time.values[0] for data in slices] == list(grouped.time.values)
+    assert all(data.a.shape == (1, 4, 5) for data in slices)
+
+
+def test_load_data_into_memmap(tmpdir):
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(5, 4, Affine(1, 0, 0, 0, -1, 4), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1, 'units': '1'}]
+    grouped = _group_datasets_by_date([
+        {'time': datetime.datetime(2016, 1, 1), 'value': 'foo'},
+        {'time': datetime.datetime(2016, 2, 1), 'value': 'bar'},
+    ])
+
+    def fake_fuse(dests, datasets, geobox, measurements, **kwargs):
+        assert isinstance(dests[0], numpy.memmap)
+        dests[0][:2] = 7
+
+    with mock.patch('datacube.api.core._fuse_measurements', side_effect=fake_fuse):
+        data = Datacube.load_data(grouped, geobox, measurements, memmap_dir=str(tmpdir))
+
+    on_disk = numpy.load(str(tmpdir.join('a.npy')), mmap_mode='r')
+    assert on_disk.shape == (2, 4, 5)
+    assert (data.a.values == on_disk).all()
+    assert (on_disk[:, :2] == 7).all() and (on_disk[:, 2:] == -1).all()
+
+    with pytest.raises(RuntimeError):
+        Datacube.load_data(grouped, geobox, measurements, memmap_dir=str(tmpdir))
+    with pytest.raises(ValueError):
+        Datacube.load_data(grouped, geobox, measurements, memmap_dir=str(tmpdir), dask_chunks={'time': 1})
+
+
+def test_load_from_file_into_memmap(tmpdir, example_file_load):
+    load, expected = example_file_load
+    data = load(memmap_dir=str(tmpdir))
+    assert (data == expected).all()
+    assert (numpy.load(str(tmpdir.join('a.npy'))) == expected).all()
+
+
+def test_load_data_into_out_arrays():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(5, 4, Affine(1, 0, 0, 0, -1, 4), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1, 'units': '1'},
+                    {'name': 'b', 'dtype': 'int16', 'nodata': -1, 'units': '1'}]
+    grouped = _group_datasets_by_date([
+        {'time': datetime.datetime(2016, 1, 1), 'value': 'foo'},
+        {'time': datetime.datetime(2016, 2, 1), 'value': 'bar'},
+    ])
+    out = numpy.zeros((2, 4, 5), dtype='int16')
+
+    def fake_fuse(dests, datasets, geobox, measurements, **kwargs):
+        for dest in dests:
+            dest[:] = 7
+
+    with mock.patch('datacube.api.core._fuse_measurements', side_effect=fake_fuse):
+        data = Datacube.load_data(grouped, geobox, measurements, out={'a': out})
+
+    assert numpy.shares_memory(data.a.values, out)
+    assert (out == 7).all()
+    assert (data.b.values == 7).all()
+
+    with pytest.raises(ValueError):
+        Datacube.load_data(grouped, geobox, measurements, out={'a': out[:1]})
+    with pytest.raises(ValueError):
+        Datacube.load_data(grouped, geobox, measurements, out={'a': out}, dask_chunks={'time': 1})
+
+
+def test_load_from_file_into_dirty_out_arrays(example_file_load):
+    load, expected = example_file_load
+    for use_threads in (False, 4):
+        out = numpy.full((2,) + expected.shape, 123, dtype='int16')
+        data = load(out={'a': out}, use_threads=use_threads)
+        assert numpy.shares_memory(data, out)
+        assert (out == expected).all()
+
+
+def test_fused_results_are_cached(tmpdir):
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(5, 4, Affine(1, 0, 0, 0, -1, 4), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1},
+                    {'name': 'b', 'dtype': 'int16', 'nodata': -1}]
+    datasets = [mock.Mock(id='cached-dataset', extent=geobox.extent)]
+
+    def fake_fuse_bands(datasources, destinations, *args, **kwargs):
+        for destination in destinations:
+            destination[:] = 3
+
+    def load(measurements):
+        dests = [numpy.zeros(geobox.shape, dtype='int16') for _ in measurements]
+        with mock.patch('datacube.api.core.new_datasource'):
+            _fuse_measurements(dests, datasets, geobox, measurements)
+        return dests
+
+    with datacube.set_options(result_cache_dir=str(tmpdir)), \
+            mock.patch('datacube.api.core.reproject_and_fuse_bands', side_effect=fake_fuse_bands) as fuse:
+        load(measurements[:1])
+        assert fuse.call_count == 1
+
+        # Only the measurement missing from the cache is read
+        a, b = load(measurements)
+        assert fuse.call_count == 2
+        assert len(fuse.call_args[0][1]) == 1
+        assert (a == 3).all() and (b == 3).all()
+
+        load(measurements)
+        assert fuse.call_count == 2
+
+
+def test_load_from_file_through_result_cache(tmpdir, example_file_load):
+    load, expected = example_file_load
+    with datacube.set_options(result_cache_dir=str(tmpdir)):
+        assert (load() == expected).all()
+        with mock.patch('datacube.api.core.reproject_and_fuse_bands') as fuse:
+            assert (load() == expected).all()
+        assert not fuse.called
+
+
+def test_plan_load_data():
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(100, 100, Affine(1, 0, 0, 0, -1, 100), crs)
+    measurements = [{'name': 'a', 'dtype': 'int16', 'nodata': -1},
+                    {'name': 'b', 'dtype': 'float32', 'nodata': -1}]
+
+    def dataset(name, left, bottom, right, top, resolution=None):
+        grid_spec = mock.Mock(crs=crs, resolution=resolution) if resolution else None
+        return mock.Mock(id='plan-' + name, crs=crs, type=mock.Mock(grid_spec=grid_spec),
+                         extent=geometry.box(left, bottom, right, top, crs=crs))
+
+    full = dataset('full', 0, 0, 100, 100)
+    half = dataset('half', 0, 0, 40, 100, resolution=(-0.5, 0.5))
+    outside = dataset('outside', 200, 200, 300, 300)
+
+    sources = numpy.empty((2,), dtype=object)
+    sources[0] = (full, half, outside)
+    sources[1] = (outside,)
+    sources = xarray.DataArray(sources, dims=['time'])
+
+    with mock.patch('datacube.api.core.measurement_paths', return_value={'a': 'a.tif', 'b': 'b.tif'}):
+        plan = Datacube.plan_load_data(sources, geobox, measurements)
+
+        assert plan.shape == (2, 100, 100)
+        assert plan.output_bytes == 2 * 100 * 100 * (2 + 4)
+        assert plan.datasets == 2
+        assert plan.files == 4
+        # 'half' is at twice the output resolution
+        assert plan.bytes_read == OrderedDict([('a', (100 * 100 + 4 * 40 * 100) * 2),
+                                               ('b', (100 * 100 + 4 * 40 * 100) * 4)])
+        assert plan.warps == 2
+        assert plan.fuses == 2
+        assert plan.dask_tasks == 0
+
+        plan = Datacube.plan_load_data(sources, geobox, measurements, dask_chunks={'time': 1, 'x': 50, 'y': 50})
+        # Only 'full' covers the right hand chunks, and nothing is read for the second time slice
+        assert plan.datasets == 4 + 2
+        assert plan.dask_tasks == 8 * 2 + 4
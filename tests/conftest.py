@@ -6,7 +6,11 @@ tests in this and sub packages.
 """
 from __future__ import print_function, absolute_import
 
+import multiprocessing
 import os
+import re
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
 import pytest
 
 
@@ -31,6 +35,58 @@ def data_folder():
     return os.path.join(os.path.split(os.path.realpath(__file__))[0], 'data')
 
 
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serve files, supporting single range requests, as used by GDAL to read remote files"""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if 'Range' not in self.headers or not os.path.isfile(path):
+            return SimpleHTTPRequestHandler.send_head(self)
+
+        size = os.path.getsize(path)
+        start, end = re.match(r'bytes=(\d+)-(\d*)', self.headers['Range']).groups()
+        start, end = int(start), min(int(end or size - 1), size - 1)
+
+        self.send_response(206)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end, size))
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            self.wfile.write(f.read(end - start + 1))
+        return None
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_directory(directory, port_queue):
+    # SimpleHTTPRequestHandler only takes a directory argument from python 3.7, serve the working directory
+    # of this (server only) process instead
+    os.chdir(directory)
+    server = HTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+@pytest.fixture
+def http_data_url(data_folder):
+    """Base URL of an HTTP server, supporting range requests, serving the test data folder
+
+    The server runs in another process, as GDAL holds the GIL while opening files.
+    """
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve_directory, args=(data_folder, port_queue), daemon=True)
+    server.start()
+    try:
+        yield 'http://127.0.0.1:%d/' % port_queue.get(timeout=10)
+    finally:
+        server.terminate()
+        server.join()
+
+
 @pytest.fixture
 def example_netcdf_path(request):
     return str(request.fspath.dirpath('data/sample_tile.nc'))
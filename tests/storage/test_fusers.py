@@ -0,0 +1,72 @@
+from __future__ import absolute_import
+
+import numpy as np
+import pytest
+
+from datacube.helpers import ga_pq_fuser
+from datacube.storage.fusers import FUSERS, StackedFuser, MaskPriorityFuser, get_fuser, register_fuser
+
+NODATA = -1
+
+STACK = np.array([[[NODATA, 3], [NODATA, 7]],
+                  [[5, 2], [NODATA, 9]],
+                  [[4, NODATA], [NODATA, 1]]], dtype='int16')
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('first', [[5, 3], [NODATA, 7]]),
+    ('last', [[4, 2], [NODATA, 1]]),
+    ('min', [[4, 2], [NODATA, 1]]),
+    ('max', [[5, 3], [NODATA, 9]]),
+    ('median', [[4, 2], [NODATA, 7]]),
+])
+def test_stacked_fusers(name, expected):
+    dest = np.empty((2, 2), dtype='int16')
+    FUSERS[name].reduce(STACK, NODATA, dest)
+    assert dest.tolist() == expected
+
+
+def test_stacked_fusers_with_nan_nodata():
+    stack = np.array([[[np.nan, 1.5]], [[2.0, np.nan]], [[3.0, np.nan]]], dtype='float32')
+    dest = np.empty((1, 2), dtype='float32')
+
+    FUSERS['median'].reduce(stack, np.float32('nan'), dest)
+    assert dest.tolist() == [[2.5, 1.5]]
+
+    FUSERS['last'].reduce(stack, np.float32('nan'), dest)
+    assert dest.tolist() == [[3.0, 1.5]]
+
+
+def test_mask_priority_fuser_matches_ga_pq_fuser():
+    valid = 1 << 8
+    stack = np.array([[[0, valid | 3, 1]],
+                      [[valid | 5, valid | 6, 2]],
+                      [[valid | 4, 1, 3]]], dtype='uint16')
+
+    expected = np.zeros((1, 3), dtype='uint16')
+    for layer in stack:
+        ga_pq_fuser(expected, layer)
+
+    dest = np.empty((1, 3), dtype='uint16')
+    MaskPriorityFuser(valid_bit=8).reduce(stack, 0, dest)
+    assert (dest == expected).all()
+
+
+def test_get_fuser():
+    assert get_fuser(None) is None
+    assert get_fuser('copy') is None
+    assert get_fuser(ga_pq_fuser) is ga_pq_fuser
+    assert get_fuser('max') is FUSERS['max']
+
+    with pytest.raises(ValueError):
+        get_fuser('no_such_fuser')
+
+    class ZeroFuser(StackedFuser):
+        def reduce(self, stack, nodata, dest):
+            dest.fill(0)
+
+    register_fuser('zero', ZeroFuser())
+    try:
+        assert isinstance(get_fuser('zero'), ZeroFuser)
+    finally:
+        del FUSERS['zero']
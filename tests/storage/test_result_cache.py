@@ -0,0 +1,155 @@
+from __future__ import absolute_import
+
+import sqlite3
+import threading
+import time
+import uuid
+
+import mock
+import numpy as np
+from affine import Affine
+
+import datacube
+from datacube.helpers import ga_pq_fuser
+from datacube.storage.fusers import FUSERS
+from datacube.storage.result_cache import ResultCache, CacheInfo, get_result_cache, invalidate_datasets, \
+    result_cache_info
+from datacube.utils import geometry
+
+GEOBOX = geometry.GeoBox(5, 4, Affine(1, 0, 0, 0, -1, 4), geometry.CRS('EPSG:3577'))
+MEASUREMENT = {'name': 'a', 'dtype': 'int16', 'nodata': -1}
+
+
+def _dataset(uri='file:///data/a.tif', **metadata):
+    id_ = uuid.uuid4()
+    return mock.Mock(id=id_, uris=[uri], metadata_doc=dict(metadata, id=str(id_)))
+
+
+def _fuser(dest, src):
+    np.copyto(dest, src, where=dest == -1)
+
+
+def _edited_fuser(dest, src):
+    np.copyto(dest, src, where=dest == -2)
+
+
+# As if `_fuser` was edited between two sessions
+_edited_fuser.__qualname__ = _edited_fuser.__name__ = _fuser.__name__
+
+
+def test_result_cache_key():
+    ds1, ds2 = _dataset(), _dataset()
+    key = ResultCache.key([ds1, ds2], GEOBOX, MEASUREMENT)
+
+    assert key == ResultCache.key([ds2, ds1], GEOBOX, MEASUREMENT)
+    assert key == ResultCache.key([ds1, ds2], GEOBOX, MEASUREMENT, fuse_func='copy')
+    assert key != ResultCache.key([ds1], GEOBOX, MEASUREMENT)
+    assert key != ResultCache.key([ds1, ds2], GEOBOX[:2, :], MEASUREMENT)
+    assert key != ResultCache.key([ds1, ds2], GEOBOX, dict(MEASUREMENT, resampling_method='cubic'))
+    assert key != ResultCache.key([ds1, ds2], GEOBOX, MEASUREMENT, fuse_func=FUSERS['max'])
+    assert key != ResultCache.key([ds1, ds2], GEOBOX, MEASUREMENT, fuse_func=ga_pq_fuser)
+
+    # Updated datasets have new keys, even if the cache wasn't told about the update
+    moved = mock.Mock(id=ds1.id, uris=['file:///elsewhere/a.tif'], metadata_doc=ds1.metadata_doc)
+    assert key != ResultCache.key([moved, ds2], GEOBOX, MEASUREMENT)
+    edited = mock.Mock(id=ds1.id, uris=ds1.uris, metadata_doc=dict(ds1.metadata_doc, label='v2'))
+    assert key != ResultCache.key([edited, ds2], GEOBOX, MEASUREMENT)
+    same = mock.Mock(id=ds1.id, uris=list(ds1.uris), metadata_doc=dict(ds1.metadata_doc))
+    assert key == ResultCache.key([same, ds2], GEOBOX, MEASUREMENT)
+
+    # Python functions are keyed on their code as well as their name
+    assert ResultCache.key([ds1], GEOBOX, MEASUREMENT, fuse_func=_fuser) == \
+        ResultCache.key([ds1], GEOBOX, MEASUREMENT, fuse_func=_fuser)
+    assert ResultCache.key([ds1], GEOBOX, MEASUREMENT, fuse_func=_fuser) != \
+        ResultCache.key([ds1], GEOBOX, MEASUREMENT, fuse_func=_edited_fuser)
+
+    # Functions without a stable name can't be cached
+    assert ResultCache.key([ds1, ds2], GEOBOX, MEASUREMENT, fuse_func=lambda dest, src: None) is None
+
+
+def test_result_cache_eviction_and_invalidation(tmpdir):
+    cache = ResultCache(str(tmpdir), max_bytes=400)
+    ds1, ds2 = _dataset(), _dataset()
+    dest = np.zeros((4, 5), dtype='int16')
+
+    key1 = cache.key([ds1, ds2], GEOBOX, MEASUREMENT)
+    assert not cache.get(key1, dest)
+    cache.put(key1, np.full((4, 5), 7, dtype='int16'), [ds1, ds2])
+    assert cache.get(key1, dest)
+    assert (dest == 7).all()
+    assert cache.info() == CacheInfo(hits=1, misses=1, entries=1, size=168, maxsize=400)
+
+    key2 = cache.key([ds2], GEOBOX, MEASUREMENT)
+    cache.put(key2, np.full((4, 5), 2, dtype='int16'), [ds2])
+    key3 = cache.key([ds1], GEOBOX, MEASUREMENT)
+    cache.put(key3, np.full((4, 5), 1, dtype='int16'), [ds1])
+    # Least recently used entry was evicted
+    assert cache.info().entries == 2
+    assert not cache.get(key1, dest)
+
+    cache.invalidate([ds2.id])
+    assert not cache.get(key2, dest)
+    assert cache.get(key3, dest)
+    assert (dest == 1).all()
+
+    # The cache persists across instances
+    assert ResultCache(str(tmpdir), max_bytes=400).get(key3, dest)
+
+
+def test_result_cache_hits_dont_wait_for_writers(tmpdir):
+    cache = ResultCache(str(tmpdir), max_bytes=400)
+    dataset = _dataset()
+    key = cache.key([dataset], GEOBOX, MEASUREMENT)
+    cache.put(key, np.full((4, 5), 5, dtype='int16'), [dataset])
+    dest = np.zeros((4, 5), dtype='int16')
+
+    # Recently used entries aren't updated on every hit
+    with mock.patch.object(cache, '_touch') as touch:
+        assert cache.get(key, dest)
+    assert not touch.called
+
+    # Another connection holds the write lock, the last use time isn't updated but the hit isn't delayed
+    writer = sqlite3.connect(str(tmpdir / 'index.sqlite'))
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        with mock.patch('time.time', return_value=time.time() + 3600):
+            assert cache.get(key, dest)
+        assert (dest == 5).all()
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_result_cache_keeps_a_connection_per_thread(tmpdir):
+    dataset = _dataset()
+    dest = np.zeros((4, 5), dtype='int16')
+    with mock.patch('sqlite3.connect', wraps=sqlite3.connect) as connect:
+        cache = ResultCache(str(tmpdir), max_bytes=400)
+        key = cache.key([dataset], GEOBOX, MEASUREMENT)
+        cache.put(key, np.full((4, 5), 3, dtype='int16'), [dataset])
+        assert cache.get(key, dest)
+        assert cache.info().entries == 1
+        assert connect.call_count == 1
+
+        thread = threading.Thread(target=cache.get, args=(key, dest))
+        thread.start()
+        thread.join()
+        assert connect.call_count == 2
+    assert cache.info().hits == 2
+
+
+def test_configured_result_cache(tmpdir):
+    assert get_result_cache() is None
+    assert result_cache_info() is None
+
+    dataset = _dataset()
+    with datacube.set_options(result_cache_dir=str(tmpdir)):
+        cache = get_result_cache()
+        assert cache is get_result_cache()
+
+        key = cache.key([dataset], GEOBOX, MEASUREMENT)
+        cache.put(key, np.ones((4, 5), dtype='int16'), [dataset])
+        assert result_cache_info().entries == 1
+
+        invalidate_datasets([dataset.id])
+        assert result_cache_info().entries == 0
@@ -1,5 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
+import os
+import threading
 from contextlib import contextmanager
 
 import mock
@@ -13,10 +15,13 @@ from affine import Affine, identity
 import datacube
 from datacube.drivers.datasource import DataSource
 from datacube.model import Dataset, DatasetType, MetadataType
-from datacube.storage.storage import OverrideBandDataSource, RasterFileDataSource
+from datacube.storage.storage import OverrideBandDataSource, RasterFileDataSource, BandDataSource
 from datacube.storage.storage import write_dataset_to_netcdf, reproject_and_fuse, read_from_source, Resampling, \
-    RasterDatasetDataSource
+    RasterDatasetDataSource, reproject_and_fuse_bands, file_handle_cache_info, clear_file_handle_cache, \
+    warp_plan_cache_info, clear_warp_plan_cache, _scratch_buffer, scratch_buffers, bind_scratch_buffers
+from datacube.storage._handles import HandleCache, CacheInfo
 from datacube.utils import geometry
+from datacube.utils.stats import collect_stats
 
 GEO_PROJ = 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,AUTHORITY["EPSG","7030"]],' \
            'AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433],' \
@@ -202,6 +207,13 @@ class BrokenBandDataSource(FakeBandDataSource):
         raise OSError('Read or write failed')
 
 
+class NoDtypeBandDataSource(FakeBandDataSource):
+    """Band source not reporting its data type, like S3 ones"""
+    def __init__(self, *args, **kwargs):
+        super(NoDtypeBandDataSource, self).__init__(*args, **kwargs)
+        del self.dtype
+
+
 def test_read_from_broken_source():
     crs = geometry.CRS('EPSG:4326')
     shape = (2, 2)
@@ -225,6 +237,288 @@ def test_read_from_broken_source():
     assert (output_data == [[2, 2], [2, 2]]).all()
 
 
+def test_single_broken_source_gives_nodata():
+    crs = geometry.CRS('EPSG:4326')
+    broken = FakeDatasetSource(value=[[1, 1], [1, 1]], crs=crs, band_source_class=BrokenBandDataSource)
+
+    output_data = np.full((2, 2), fill_value=5, dtype='int16')
+    reproject_and_fuse([broken], output_data, dst_transform=identity,
+                       dst_projection=crs, dst_nodata=-1, skip_broken_datasets=True)
+    assert (output_data == -1).all()
+
+
+def test_single_source_overwrites_dirty_destination():
+    source = FakeDatasetSource(value=[[1, 1], [1, 1]], crs=geometry.CRS('EPSG:4326'))
+
+    # The fake warp writes nothing, like one missing the destination
+    output_data = np.full((2, 2), fill_value=5, dtype='int16')
+    reproject_and_fuse([source], output_data, dst_transform=identity, dst_projection=geometry.CRS('EPSG:3577'),
+                       dst_nodata=-1, resampling='bilinear')
+    assert (output_data == -1).all()
+
+
+def test_integer_ratio_read_without_dtype_warps():
+    crs = geometry.CRS('EPSG:4326')
+    source = FakeDatasetSource(value=[[1, 1], [1, 1]], crs=crs, band_source_class=NoDtypeBandDataSource)
+
+    output_data = np.full((1, 1), fill_value=5, dtype='int16')
+    with mock.patch.object(NoDtypeBandDataSource, 'reproject', autospec=True) as reproject:
+        reproject_and_fuse([source], output_data, dst_transform=Affine.scale(2, 2), dst_projection=crs,
+                           dst_nodata=-1)
+    assert reproject.call_count == 1
+    assert (output_data == -1).all()
+
+
+def test_scratch_buffers_are_reused():
+    # Not kept outside of a load
+    assert _scratch_buffer((3, 4), 'int16') is not _scratch_buffer((3, 4), 'int16')
+
+    with scratch_buffers():
+        first = _scratch_buffer((3, 4), 'int16')
+        assert _scratch_buffer((3, 4), 'int16') is first
+        assert _scratch_buffer((3, 4), 'int16', slot=1) is not first
+        assert _scratch_buffer((3, 4), 'float32') is not first
+        with scratch_buffers():
+            assert _scratch_buffer((3, 4), 'int16') is first
+
+        other_thread = []
+
+        def work():
+            buffer_ = _scratch_buffer((3, 4), 'int16')
+            other_thread.extend([buffer_, _scratch_buffer((3, 4), 'int16')])
+
+        thread = threading.Thread(target=bind_scratch_buffers(work))
+        thread.start()
+        thread.join()
+        assert other_thread[0] is not first
+        assert other_thread[0] is other_thread[1]
+
+        # Least recently used buffers beyond the limit are dropped, 0 disables reuse
+        with datacube.set_options(scratch_buffer_bytes=30):
+            assert _scratch_buffer((3, 4), 'int16', slot=2) is not first
+            assert _scratch_buffer((3, 4), 'int16') is not first
+        with datacube.set_options(scratch_buffer_bytes=0):
+            assert _scratch_buffer((3, 4), 'int16') is not _scratch_buffer((3, 4), 'int16')
+
+    # Freed once the load is finished
+    assert datacube.storage.storage._SCRATCH.buffers is None
+
+
+def test_multiband_file_is_opened_once(data_folder):
+    filename = os.path.join(data_folder, 'test.tif')
+    with rasterio.open(filename) as src:
+        expected = src.read()[:, 20:70, 10:70]
+        dst_transform = src.transform * Affine.translation(10, 20)
+
+    sources = [[RasterFileDataSource(filename, bandnumber=1), RasterFileDataSource(filename, bandnumber=2)]]
+    destinations = [np.empty((50, 60), dtype='int16'), np.empty((50, 60), dtype='int16')]
+
+    with mock.patch('rasterio.open', wraps=rasterio.open) as rasterio_open:
+        reproject_and_fuse_bands(sources, destinations, dst_transform, geometry.CRS('EPSG:4326'), [-999, -999])
+
+    assert rasterio_open.call_count == 1
+    for band, destination in zip(expected, destinations):
+        assert (destination == band).all()
+
+
+def test_file_handle_cache_reuses_open_files(data_folder):
+    source = RasterFileDataSource(os.path.join(data_folder, 'test.tif'), bandnumber=1)
+
+    clear_file_handle_cache()
+    with datacube.set_options(file_handle_cache_size=2):
+        with mock.patch('rasterio.open', wraps=rasterio.open) as rasterio_open:
+            for _ in range(3):
+                with source.open() as band:
+                    assert band.read(window=((0, 10), (0, 10))).shape == (10, 10)
+
+        assert rasterio_open.call_count == 1
+        assert file_handle_cache_info() == CacheInfo(hits=2, misses=1, size=1, maxsize=2)
+    clear_file_handle_cache()
+    assert file_handle_cache_info() == CacheInfo(hits=0, misses=0, size=0, maxsize=0)
+
+
+def test_handle_cache_eviction():
+    class FakeHandle(object):
+        def __init__(self, filename):
+            self.filename = filename
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    cache = HandleCache(opener=FakeHandle)
+
+    with cache.open('a', maxsize=1) as a1:
+        with cache.open('a', maxsize=1) as a2:
+            # Handles in use are never shared
+            assert a1 is not a2
+    assert a2.closed and not a1.closed
+
+    with cache.open('b', maxsize=1) as b1:
+        pass
+    # least recently used file is closed
+    assert a1.closed
+
+    with cache.open('b', maxsize=1) as b2:
+        assert b2 is b1
+    assert cache.info(1) == CacheInfo(hits=1, misses=3, size=1, maxsize=1)
+
+    with pytest.raises(OSError):
+        with cache.open('b', maxsize=1) as b3:
+            raise OSError('Read or write failed')
+    # handles that failed are not put back
+    assert b3.closed
+    assert cache.info(1).size == 0
+
+    # nor are handles of readers interrupted by a BaseException, eg. a generator being closed
+    def reader():
+        with cache.open('c', maxsize=1) as handle:
+            yield handle
+
+    gen = reader()
+    c1 = next(gen)
+    gen.close()
+    assert c1.closed
+    assert cache.info(1).size == 0
+
+
+def test_fusing_stops_once_destination_is_complete():
+    crs = geometry.CRS('EPSG:4326')
+    shape = (2, 2)
+    no_data = -1
+
+    source1 = FakeDatasetSource(value=[[1, 1], [no_data, 1]], crs=crs)
+    source2 = FakeDatasetSource(value=[[2, 2], [2, 2]], crs=crs)
+    source3 = FakeDatasetSource(value=[[3, 3], [3, 3]], crs=crs, band_source_class=BrokenBandDataSource)
+    sources = [source1, source2, source3]
+
+    output_data = np.full(shape, fill_value=no_data, dtype='int16')
+    # The broken third source is never read
+    reproject_and_fuse(sources, output_data, dst_transform=identity, dst_projection=crs, dst_nodata=no_data)
+    assert (output_data == [[1, 1], [2, 1]]).all()
+
+    # Custom fusers get to see every source
+    def custom_fuser(dest, src):
+        np.copyto(dest, src, where=(dest == no_data))
+
+    with pytest.raises(OSError):
+        reproject_and_fuse(sources, output_data, dst_transform=identity, dst_projection=crs, dst_nodata=no_data,
+                           fuse_func=custom_fuser)
+
+
+def test_nan_nodata_is_fused():
+    crs = geometry.CRS('EPSG:4326')
+    nan = float('nan')
+
+    source1 = FakeDatasetSource(value=[[1, 1], [nan, nan]], crs=crs)
+    source2 = FakeDatasetSource(value=[[2, 2], [2, 2]], crs=crs)
+
+    output_data = np.empty((2, 2), dtype='float32')
+    reproject_and_fuse([source1, source2], output_data, dst_transform=identity, dst_projection=crs, dst_nodata=nan)
+    assert (output_data == [[1, 1], [2, 2]]).all()
+
+
+def test_stacked_fusers_are_given_every_readable_source():
+    crs = geometry.CRS('EPSG:4326')
+    no_data = -1
+
+    source1 = FakeDatasetSource(value=[[1, 5], [no_data, 1]], crs=crs)
+    source2 = FakeDatasetSource(value=[[2, 2], [no_data, 2]], crs=crs)
+    broken = FakeDatasetSource(value=[[9, 9], [9, 9]], crs=crs, band_source_class=BrokenBandDataSource)
+
+    output_data = np.empty((2, 2), dtype='int16')
+    reproject_and_fuse([source1, broken, source2], output_data, dst_transform=identity, dst_projection=crs,
+                       dst_nodata=no_data, fuse_func='max', skip_broken_datasets=True)
+    assert (output_data == [[2, 5], [no_data, 2]]).all()
+
+
+def test_concurrent_reads_from_http(http_data_url, data_folder):
+    crs = geometry.CRS('EPSG:4326')
+    nodata = -999
+    dst_transform = Affine(0.0005, 0.0, 144.1, 0.0, -0.0005, -35.1)
+
+    def sources(base):
+        return [RasterFileDataSource(base + 'test.tif', bandnumber=band) for band in (1, 2, 1, 2)]
+
+    def load(datasources, **options):
+        dest = np.empty((200, 300), dtype='int16')
+        with datacube.set_options(**options):
+            reproject_and_fuse(datasources, dest, dst_transform, crs, nodata)
+        return dest
+
+    expected = load(sources(os.path.join(data_folder, '')))
+    with mock.patch('datacube.storage.storage._reader_pool',
+                    wraps=datacube.storage.storage._reader_pool) as pool:
+        with collect_stats() as stats:
+            remote = load(sources(http_data_url), concurrent_reads=4)
+        remote_again = load(sources(http_data_url), concurrent_reads=4)
+    assert pool.call_count == 2
+    assert (remote == expected).all()
+    assert (remote_again == expected).all()
+    # Files opened by the reader threads are counted in the stats of the load
+    assert stats['open'].calls > 0
+    # Every load shares the same pool of readers
+    assert datacube.storage.storage._reader_pool(4) is datacube.storage.storage._reader_pool(4)
+
+
+def test_replaced_reader_pool_keeps_working():
+    pool = datacube.storage.storage._reader_pool(2)
+    assert datacube.storage.storage._reader_pool(3) is not pool
+    # Eg. used by a load started before the concurrent_reads option changed
+    assert pool.submit(sum, [1, 2]).result() == 3
+
+
+def test_concurrent_reads_stop_when_complete():
+    crs = geometry.CRS('EPSG:4326')
+    no_data = -1
+
+    sources = [FakeDatasetSource(value=[[1, 1], [no_data, 1]], crs=crs),
+               FakeDatasetSource(value=[[2, 2], [2, 2]], crs=crs)]
+    sources += [FakeDatasetSource(value=[[3, 3], [3, 3]], crs=crs, band_source_class=BrokenBandDataSource)] * 4
+
+    output_data = np.empty((2, 2), dtype='int16')
+    with datacube.set_options(concurrent_reads=2):
+        # Only the first two sources are read, the broken ones after them are not needed
+        reproject_and_fuse(sources, output_data, dst_transform=identity, dst_projection=crs, dst_nodata=no_data)
+    assert (output_data == [[1, 1], [2, 1]]).all()
+
+
+def test_read_aligned_grid_without_warp(data_folder):
+    filename = os.path.join(data_folder, 'test.tif')
+    with rasterio.open(filename) as src:
+        expected = src.read(2)
+        src_transform = src.transform
+    expected[expected == -999] = -1
+
+    crs = geometry.CRS('EPSG:4326')
+    # Overhanging the top left corner of the file
+    dst_transform = src_transform * Affine.translation(-5, -3)
+    dest = np.empty((20, 30), dtype='int16')
+    with mock.patch('rasterio.warp.reproject') as reproject:
+        read_from_source(RasterFileDataSource(filename, bandnumber=2), dest, dst_transform,
+                         dst_nodata=-1, dst_projection=crs, resampling=Resampling.bilinear)
+    assert not reproject.called
+
+    assert (dest[:3] == -1).all()
+    assert (dest[:, :5] == -1).all()
+    assert (dest[3:, 5:] == expected[:17, :25]).all()
+
+
+def test_load_stats(data_folder):
+    crs = geometry.CRS('EPSG:4326')
+    dst_transform = Affine(0.0005, 0.0, 144.1, 0.0, -0.0005, -35.1)
+    datasources = [RasterFileDataSource(os.path.join(data_folder, 'test.tif'), bandnumber=band) for band in (1, 2)]
+
+    dest = np.empty((200, 300), dtype='int16')
+    with collect_stats() as stats:
+        reproject_and_fuse(datasources, dest, dst_transform, crs, -999, fuse_func='max')
+
+    assert stats['open'].calls == 2
+    assert stats['read'].calls + stats['reproject'].calls == 2
+    assert stats['fuse'].calls == 1
+    assert stats['fuse'].bytes == 2 * dest.nbytes
+
+
 def _create_broken_netcdf(tmpdir):
     import os
     output_path = str(tmpdir / 'broken_netcdf_file.nc')
@@ -249,6 +543,7 @@ class FakeDataSource(object):
         self.shape = (613, 597)
 
         self.data = np.full(self.shape, self.nodata, dtype='int16')
+        self.dtype = self.data.dtype
         self.data[:512, :512] = np.arange(512) + np.arange(512).reshape((512, 1))
 
     def read(self, window=None, out_shape=None):
@@ -452,9 +747,58 @@ def test_read_from_source():
         dst_projection=data_source.crs,
         resampling=Resampling.cubic)
 
+    # integer ratios, resampled with numpy
+    assert_same_read_results(
+        source,
+        dst_shape=(700, 650),
+        dst_dtype='float32',
+        dst_transform=data_source.transform * Affine.translation(-100.5, 30.25) * Affine.scale(0.5, 0.25),
+        dst_nodata=float('nan'),
+        dst_projection=data_source.crs,
+        resampling=Resampling.nearest)
+
+    for resampling in (Resampling.average, Resampling.mode, Resampling.min, Resampling.max):
+        assert_same_read_results(
+            source,
+            dst_shape=(150, 160),
+            dst_dtype='int16',
+            dst_transform=data_source.transform * Affine.translation(30, 27) * Affine.scale(3, 3),
+            dst_nodata=-1,
+            dst_projection=data_source.crs,
+            resampling=resampling)
+
     # TODO: crs change
 
 
+def test_read_with_warp_plans():
+    data_source = FakeDataSource()
+
+    @contextmanager
+    def fake_open():
+        yield data_source
+
+    source = mock.Mock()
+    source.open = fake_open
+
+    clear_warp_plan_cache()
+    with datacube.set_options(warp_plan_cache_bytes=10 * 1024 ** 2):
+        for _ in range(2):
+            assert_same_read_results(
+                source,
+                dst_shape=(300, 400),
+                dst_dtype='int16',
+                dst_transform=Affine(10000, 0, -1000000, 0, -10000, -2000000),
+                dst_nodata=-1,
+                dst_projection=geometry.CRS('EPSG:3577'),
+                resampling=Resampling.nearest)
+
+    info = warp_plan_cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.size == 300 * 400 * 5
+    clear_warp_plan_cache()
+
+
 def test_read_raster_with_custom_crs_and_transform(example_gdal_path):
     with rasterio.open(example_gdal_path) as src:
         band = rasterio.band(src, 1)
@@ -478,6 +822,76 @@ def test_read_raster_with_custom_crs_and_transform(example_gdal_path):
         assert (dest1 == dest2).all()
 
 
+def test_override_band_reproject_reads_only_the_required_window(example_gdal_path):
+    with rasterio.open(example_gdal_path) as src:
+        band = rasterio.band(src, 1)
+        crs = geometry.CRS('EPSG:3577')
+        nodata = -999
+        transform = Affine(25.0, 0.0, 1000000.0,
+                           0.0, -25.0, -900000.0)
+        band_data_source = OverrideBandDataSource(band, nodata, crs, transform)
+        expected = band_data_source.read()[1000:1100, 2000:2200]
+
+        dest = np.full(shape=(100, 200), fill_value=nodata, dtype=np.int16)
+        dst_transform = transform * Affine.translation(2000, 1000)
+        with mock.patch.object(band_data_source, 'read', wraps=band_data_source.read) as read:
+            band_data_source.reproject(dest, dst_transform, crs, nodata, Resampling.nearest)
+
+        (rows, cols) = read.call_args[1]['window']
+        assert rows[0] <= 1000 and rows[1] >= 1100 and rows[1] - rows[0] < 110
+        assert cols[0] <= 2000 and cols[1] >= 2200 and cols[1] - cols[0] < 210
+        assert (dest == expected).all()
+
+        # Destination outside of the source
+        with mock.patch.object(band_data_source, 'read', wraps=band_data_source.read) as read:
+            band_data_source.reproject(dest, transform * Affine.translation(-500, -500), crs, nodata,
+                                       Resampling.nearest)
+        assert not read.called
+        assert (dest == nodata).all()
+
+
+def test_reproject_reads_from_overviews(tmpdir):
+    filename = str(tmpdir.join('overviews.tif'))
+    crs = geometry.CRS('EPSG:3577')
+    nodata = -999
+    transform = Affine(25.0, 0.0, 1000000.0,
+                       0.0, -25.0, -900000.0)
+    with rasterio.open(filename, 'w', driver='GTiff', width=512, height=512, count=1, dtype='int16',
+                       crs=str(crs), transform=transform, nodata=nodata) as dst:
+        dst.write(np.zeros((512, 512), dtype='int16'), 1)
+        dst.build_overviews([2, 4, 8], Resampling.average)
+    # Overviews aren't updated, so data read from them is distinguishable
+    with rasterio.open(filename, 'r+') as dst:
+        dst.write(np.ones((512, 512), dtype='int16'), 1)
+
+    def load(resampling):
+        dest = np.full(shape=(64, 64), fill_value=nodata, dtype=np.int16)
+        with rasterio.open(filename) as src:
+            BandDataSource(rasterio.band(src, 1)).reproject(dest, transform * Affine.scale(8), crs, nodata,
+                                                            resampling)
+        return dest
+
+    assert (load(Resampling.average) == 0).all()
+    assert (load(Resampling.nearest) == 1).all()
+    with datacube.set_options(overview_resampling=()):
+        assert (load(Resampling.average) == 1).all()
+
+    # Loading at an integer ratio of the source resolution reads overviews too
+    def load_from_source(resampling, scale):
+        dest = np.full(shape=(512 // scale, 512 // scale), fill_value=nodata, dtype=np.int16)
+        read_from_source(RasterFileDataSource(filename, bandnumber=1), dest, transform * Affine.scale(scale),
+                         nodata, crs, resampling)
+        return dest
+
+    assert (load_from_source(Resampling.average, 8) == 0).all()
+    assert (load_from_source(Resampling.average, 16) == 0).all()
+    # Overviews aren't used for nearest neighbour, nor when finer than the overviews
+    assert (load_from_source(Resampling.nearest, 8) == 1).all()
+    assert (load_from_source(Resampling.average, 1) == 1).all()
+    with datacube.set_options(overview_resampling=()):
+        assert (load_from_source(Resampling.average, 8) == 1).all()
+
+
 def test_read_from_file_with_missing_crs(no_crs_gdal_path):
     """
     We need to be able to read from data files even when GDAL can't automatically gather all the metdata.
@@ -4,7 +4,10 @@ Tests for MultiprocessingExecutor
 
 from datacube.executor import get_executor
 from time import sleep
+import os
+import numpy
 import pytest
+import xarray
 
 DATA = [1, 2, 3, 4]
 RETRIES = 5
@@ -16,6 +19,14 @@ def _echo(x, please_fail=False):
     return x
 
 
+def _make_arrays(size):
+    data = numpy.arange(size * size, dtype='int32').reshape(size, size)
+    dataset = xarray.Dataset({'big': (('y', 'x'), data, {'units': 'm'}),
+                              'small': (('y',), numpy.arange(size))},
+                             coords={'y': numpy.arange(size), 'x': numpy.arange(size)})
+    return {'array': data, 'dataset': dataset, 'other': [1, 'two']}
+
+
 def run_executor_tests(executor, sleep_time=1):
     # get_ready: mostly pending
     futures = executor.map(_echo, DATA)
@@ -86,3 +97,25 @@ def test_fallback_executor():
     assert 'Serial' in str(executor)
 
     run_executor_tests(executor, sleep_time=0)
+
+
+@pytest.mark.parametrize('use_cloud_pickle', [True, False])
+def test_shared_memory_results(use_cloud_pickle):
+    executor = get_executor(None, 2, use_cloud_pickle=use_cloud_pickle, shared_memory_results=True)
+    run_executor_tests(executor)
+
+    expected = _make_arrays(1024)
+    future = executor.submit(_make_arrays, 1024)
+    result = executor.result(future)
+
+    assert isinstance(result['array'], numpy.memmap)
+    numpy.testing.assert_array_equal(result['array'], expected['array'])
+    xarray.testing.assert_identical(result['dataset'], expected['dataset'])
+    assert result['other'] == [1, 'two']
+
+    shared_files = os.listdir(executor._shared_directory)  # pylint: disable=protected-access
+    assert len(shared_files) == 2
+
+    del result
+    executor.release(future)
+    assert not os.listdir(executor._shared_directory)  # pylint: disable=protected-access
@@ -1,5 +1,7 @@
 from __future__ import absolute_import
 
+import cachetools
+import mock
 import numpy as np
 import osgeo
 import pytest
@@ -9,7 +11,7 @@ try:
 except ImportError:
     import pickle
 
-from datacube.utils import geometry
+from datacube.utils import geometry, intersects
 
 
 def test_pickleable():
@@ -40,6 +42,38 @@ def test_geobox_simple():
     np.testing.assert_almost_equal(t.coords['longitude'].values[:10], expect_lon)
 
 
+def test_geobox_value_type():
+    from affine import Affine
+    crs = geometry.CRS('EPSG:3577')
+    geobox = geometry.GeoBox(4000, 3000, Affine(25, 0.0, 1500000, 0.0, -25, -3900000), crs)
+
+    unpickled = pickle.loads(pickle.dumps(geobox, pickle.HIGHEST_PROTOCOL))
+    assert unpickled == geobox
+    assert hash(unpickled) == hash(geobox)
+    assert unpickled.crs is crs
+    assert unpickled.extent == geobox.extent
+
+    sub = geobox[10:20, 5:]
+    assert sub.shape == (10, 3995)
+    assert sub.affine == geobox.affine * Affine.translation(5, 10)
+    assert sub != geobox
+    assert geobox[:, :] == geobox
+
+    assert geobox.extent is geobox.extent
+    # Coordinates are computed once, but callers get their own arrays
+    xs = geobox.coordinates['x'].values
+    xs += 1
+    assert (geobox.coordinates['x'].values == xs - 1).all()
+    assert geobox.coordinates['x'].values is not geobox.coordinates['x'].values
+
+    # CRSs with an EPSG code are pickled as the code, not their WKT
+    from_wkt = geometry.GeoBox(4000, 3000, geobox.affine, geometry.CRS(crs.wkt))
+    assert b'EPSG:3577' in pickle.dumps(from_wkt, pickle.HIGHEST_PROTOCOL)
+    assert pickle.loads(pickle.dumps(from_wkt, pickle.HIGHEST_PROTOCOL)) == geobox
+    with pytest.raises(AttributeError):
+        geobox.width = 10
+
+
 def test_props():
     box1 = geometry.box(10, 10, 30, 30, crs=geometry.CRS('EPSG:4326'))
     assert box1
@@ -231,6 +265,96 @@ class TestCRSEqualityComparisons(object):
         assert a != geometry.CRS('EPSG:4326')
 
 
+def test_crs_interning():
+    crs = geometry.CRS('EPSG:3577')
+    assert geometry.CRS('EPSG:3577') is crs
+    assert geometry.CRS(' epsg:3577') is crs
+    assert geometry.CRS(crs) is crs
+    assert pickle.loads(pickle.dumps(crs, pickle.HIGHEST_PROTOCOL)) is crs
+    assert str(geometry.CRS('epsg:3577')) == 'EPSG:3577'
+
+    albers = geometry.CRS('+proj=aea +lat_1=-18 +lat_2=-36 +lat_0=0 +lon_0=132 +x_0=0 +y_0=0 '
+                          '+ellps=GRS80 +towgs84=0,0,0,0,0,0,0 +units=m +no_defs')
+    assert albers == crs
+    assert hash(albers) == hash(crs)
+    assert len({crs, albers, geometry.CRS('EPSG:4326')}) == 2
+    assert crs == 'EPSG:3577'
+    assert crs != geometry.CRS('EPSG:4326')
+
+    # Equality is symmetric, whatever was created first
+    from_wkt = geometry.CRS(crs.wkt)
+    assert from_wkt == crs and crs == from_wkt
+    assert hash(from_wkt) == hash(crs)
+
+    # Only recently used CRSs are kept
+    with mock.patch.object(geometry, '_CRS_REGISTRY', cachetools.LRUCache(maxsize=2)):
+        first = geometry.CRS('EPSG:32755')
+        geometry.CRS('EPSG:32756')
+        geometry.CRS('EPSG:28355')
+        assert len(geometry._CRS_REGISTRY) == 2
+        assert geometry.CRS('EPSG:32755') is not first
+        assert geometry.CRS('EPSG:32755') == first
+
+
+def test_crs_comparisons_are_cached():
+    albers, utm = geometry.CRS('EPSG:3577'), geometry.CRS('EPSG:32755')
+    is_same = osgeo.osr.SpatialReference.IsSame
+    with mock.patch.object(geometry, '_CRS_EQUALITY', cachetools.LRUCache(maxsize=2)), \
+            mock.patch.object(osgeo.osr.SpatialReference, 'IsSame', autospec=True, side_effect=is_same) as compared:
+        for _ in range(100):
+            assert albers != utm and utm != albers
+        assert compared.call_count == 1
+
+
+def test_prepared_geometry():
+    crs = geometry.CRS('EPSG:4326')
+    poly = geometry.polygon([(10, 10), (30, 10), (30, 30), (20, 15), (10, 30), (10, 10)], crs=crs)
+    prepared = poly.prepare()
+    assert prepared.crs == crs
+
+    others = [geometry.box(0, 0, 5, 5, crs),  # disjoint bounding box
+              geometry.box(30, 10, 40, 20, crs),  # touches
+              geometry.box(18, 20, 22, 25, crs),  # inside the bounding box only
+              geometry.box(12, 11, 14, 13, crs),  # inside
+              geometry.box(5, 5, 15, 15, crs),  # overlaps
+              geometry.box(0, 0, 50, 50, crs)]  # covers
+    for other in others:
+        assert prepared.intersects(other) == poly.intersects(other)
+        assert prepared.touches(other) == poly.touches(other)
+        assert prepared.contains(other) == poly.contains(other)
+        assert prepared.disjoint(other) == poly.disjoint(other)
+        assert intersects(prepared, other) == intersects(poly, other)
+
+
+def test_transform_points():
+    albers = geometry.CRS('EPSG:3577')
+    wgs84 = geometry.CRS('EPSG:4326')
+    lons = np.array([[148.2697, 149.31254], [148.2697, 149.31254]])
+    lats = np.array([[-35.20111, -35.20111], [-36.331431, -36.331431]])
+
+    xs, ys = geometry.transform_points(lons, lats, wgs84, albers)
+    assert xs.shape == ys.shape == (2, 2)
+    for lon, lat, x, y in zip(lons.ravel(), lats.ravel(), xs.ravel(), ys.ravel()):
+        expected = geometry.point(lon, lat, wgs84).to_crs(albers).coords[0]
+        assert np.allclose((x, y), expected[:2])
+
+    back_lons, back_lats = geometry.transform_points(xs, ys, albers, wgs84)
+    assert np.allclose(back_lons, lons)
+    assert np.allclose(back_lats, lats)
+
+
+def test_geometries_to_crs():
+    albers = geometry.CRS('EPSG:3577')
+    wgs84 = geometry.CRS('EPSG:4326')
+    boxes = [geometry.box(148, -36, 149, -35, wgs84),
+             geometry.box(1500000, -4000000, 1600000, -3900000, albers)]
+
+    converted = geometry.geometries_to_crs(boxes, albers)
+    assert [geom.crs for geom in converted] == [albers, albers]
+    assert converted[0] == boxes[0].to_crs(albers)
+    assert converted[1] is boxes[1]
+
+
 def test_geobox():
     points_list = [
         [(148.2697, -35.20111), (149.31254, -35.20111), (149.31254, -36.331431), (148.2697, -36.331431)],
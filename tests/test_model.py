@@ -18,6 +18,23 @@ def test_gridspec():
     assert numpy.isclose(cells[(2, 0)].coordinates['latitude'].values, numpy.linspace(10.95, 10.05, num=10)).all()
 
 
+def test_gridspec_tile_indices():
+    gs = GridSpec(crs=geometry.CRS('EPSG:4326'), tile_size=(1, 1), resolution=(-0.1, 0.1), origin=(10, 10))
+    poly = geometry.polygon([(10, 12.2), (10.8, 13), (13, 10.8), (12.2, 10), (10, 12.2)], crs=geometry.CRS('EPSG:4326'))
+
+    indices = gs.tile_indices_inside_geopolygon(poly)
+    assert indices.shape == (7, 2)
+    assert [tuple(index) for index in indices.tolist()] == [index for index, _ in gs.tiles_inside_geopolygon(poly)]
+    assert set(map(tuple, indices.tolist())) == {(0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1)}
+
+    buffered = set(map(tuple, gs.tile_indices_inside_geopolygon(poly, tile_buffer=(0.5, 0.5)).tolist()))
+    assert buffered == ({(x, y) for x in range(-1, 4) for y in range(-1, 4)} -
+                        {(-1, -1), (-1, 0), (0, -1), (2, 3), (3, 2), (3, 3)})
+
+    assert gs.tile_indices_inside_geopolygon(geometry.box(100, 100, 101, 101, crs=geometry.CRS('EPSG:4326'))).shape \
+        == (1, 2)
+
+
 def test_gridspec_upperleft():
     """ Test to ensure grid indexes can be counted correctly from bottom left or top left
     """
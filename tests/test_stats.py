@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from datacube.utils import stats
+from datacube.utils.stats import bind_stats, collect_stats, log_stats, timed
+
+
+def test_timed_is_a_no_op_without_collectors():
+    with timed('read') as timer:
+        timer.nbytes = 100
+    assert timer is timed('open')
+
+    with collect_stats() as collected:
+        pass
+    assert collected.as_dict() == {}
+    assert stats._active() == ()
+
+
+def test_collect_stats():
+    with collect_stats() as outer:
+        with timed('open'):
+            pass
+        with collect_stats() as inner:
+            with timed('read') as timer:
+                timer.nbytes = 100
+            with timed('read', 50):
+                pass
+
+    assert list(outer.as_dict()) == ['open', 'read']
+    assert outer['read'].calls == 2
+    assert outer['read'].bytes == 150
+    assert outer['read'].seconds >= 0
+    assert list(inner.as_dict()) == ['read']
+    assert inner['open'].calls == 0
+
+
+def test_collect_stats_from_other_threads():
+    def work():
+        for _ in range(100):
+            with timed('fuse', 1):
+                pass
+
+    with collect_stats() as collected:
+        threads = [threading.Thread(target=bind_stats(work)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert collected['fuse'].calls == 400
+    assert collected['fuse'].bytes == 400
+
+
+def test_concurrent_collectors_are_separate():
+    started = threading.Barrier(2)
+    results = {}
+
+    def load(name, calls):
+        with collect_stats() as collected:
+            started.wait()
+            for _ in range(calls):
+                with timed('read'):
+                    pass
+            started.wait()
+        results[name] = collected
+
+    threads = [threading.Thread(target=load, args=(name, calls)) for name, calls in (('a', 3), ('b', 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results['a']['read'].calls == 3
+    assert results['b']['read'].calls == 5
+
+    # Threads not started by a collecting load aren't counted
+    with collect_stats() as collected:
+        thread = threading.Thread(target=load, args=('c', 1))
+        thread.start()
+        started.wait()
+        started.wait()
+        thread.join()
+    assert collected['read'].calls == 0
+
+
+def test_stats_are_sent_to_sink(caplog):
+    received = []
+    with collect_stats(sink=received.append) as collected:
+        with timed('index_search'):
+            pass
+    assert received == [collected]
+
+    with caplog.at_level(logging.INFO):
+        with collect_stats(sink=log_stats()):
+            with timed('index_search'):
+                pass
+    assert 'index_search' in caplog.text